@@ -0,0 +1,102 @@
+import asyncio
+import os
+import time
+from accounts import Account
+from async_database import run_read, run_write
+
+FLUSH_INTERVAL_SECONDS = float(os.getenv("ACCOUNT_FLUSH_INTERVAL_SECONDS", "2"))
+FLUSH_EVERY_CHANGES = int(os.getenv("ACCOUNT_FLUSH_EVERY_CHANGES", "50"))
+# "sync" writes trades to the ledger before the tool returns; "write-behind" buffers them like other changes
+TRADE_DURABILITY = os.getenv("ACCOUNT_TRADE_DURABILITY", "sync")
+# Resident accounts are checked for writes from other processes at most this often
+REFRESH_SECONDS = float(os.getenv("ACCOUNT_CACHE_REFRESH_SECONDS", "1"))
+
+
+class AccountCache:
+    """
+    Accounts kept resident in one server process. Reads are served from memory, and changes
+    are written to the ledger behind the caller: every FLUSH_EVERY_CHANGES changes, every
+    FLUSH_INTERVAL_SECONDS and on shutdown. Trades are written immediately when
+    TRADE_DURABILITY is "sync".
+
+    Operations on one account run one at a time in this process, while different accounts run in
+    parallel. Writes from other processes are caught by the ledger's compare-and-swap append:
+    a sync trade that loses the race is re-validated against the latest state and retried.
+    """
+
+    def __init__(self, flush_every: int = FLUSH_EVERY_CHANGES, trade_durability: str = TRADE_DURABILITY,
+                 refresh_seconds: float = REFRESH_SECONDS):
+        self.flush_every = flush_every
+        self.trade_durability = trade_durability
+        self.refresh_seconds = refresh_seconds
+        self._accounts: dict[str, Account] = {}
+        self._checked: dict[str, float] = {}
+        self._locks: dict[str, asyncio.Lock] = {}
+        self._changes = 0
+
+    def _fresh(self, name: str) -> Account | None:
+        account = self._accounts.get(name)
+        if account and time.monotonic() - self._checked[name] <= self.refresh_seconds:
+            return account
+        return None
+
+    def get(self, name: str) -> Account:
+        name = name.lower()
+        account = self._accounts.get(name)
+        now = time.monotonic()
+        if account is None:
+            account = Account.get(name)
+            account.set_write_behind(True, trades=self.trade_durability != "sync")
+            self._accounts[name] = account
+            self._checked[name] = now
+        elif now - self._checked[name] > self.refresh_seconds:
+            # Accounts with unwritten changes catch up when they are flushed instead
+            if not account.has_pending_writes:
+                account.refresh()
+            self._checked[name] = now
+        return account
+
+    async def _load(self, name: str) -> Account:
+        # Loading an account for the first time may create it, so that goes to the writer thread
+        if name in self._accounts:
+            return await run_read(self.get, name)
+        return await run_write(self.get, name)
+
+    async def aget(self, name: str) -> Account:
+        """ Like get, but loads or refreshes the account on a database thread so the event loop isn't blocked. """
+        name = name.lower()
+        account = self._fresh(name)
+        if account:
+            return account
+        async with self._locks.setdefault(name, asyncio.Lock()):
+            return await self._load(name)
+
+    async def run(self, name: str, operation, changed: bool = False, trade: bool = False):
+        """
+        Await operation(account) on a worker thread, one operation per account at a time.
+        Operations may wait on the price feed, so they don't go to the database writer thread,
+        where they would hold up every other account; their own writes queue on SQLite's lock.
+        Pass changed=True for operations that record ledger events, and trade=True for trades.
+        """
+        name = name.lower()
+        async with self._locks.setdefault(name, asyncio.Lock()):
+            account = self._fresh(name) or await self._load(name)
+            result = await asyncio.to_thread(operation, account)
+            if changed or trade:
+                self._changes += 1
+        if self._changes >= self.flush_every:
+            await self.aflush()
+        return result
+
+    async def aflush(self):
+        """ Write every account's pending events on the database writer thread. """
+        for name, account in list(self._accounts.items()):
+            if account.has_pending_writes:
+                async with self._locks.setdefault(name, asyncio.Lock()):
+                    await run_write(account.flush)
+        self._changes = 0
+
+    async def flush_periodically(self, interval: float = FLUSH_INTERVAL_SECONDS):
+        while True:
+            await asyncio.sleep(interval)
+            await self.aflush()
@@ -1,14 +1,26 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, PrivateAttr
+from typing import Literal, Iterable
+from array import array
+import functools
 import json
+import os
+import warnings
+import numpy as np
 from dotenv import load_dotenv
 from datetime import datetime
-from market import get_share_price
-from database import write_account, read_account, write_log
+from market import get_share_price, get_share_prices
+from database import transaction as database_transaction, LedgerConflict, has_ledger_event, read_account, write_log, append_ledger_many, read_ledger, count_ledger, clear_ledger, write_snapshot, read_snapshot, write_valuations, read_valuations, clear_valuations, write_account_summary, read_held_symbols, update_position_prices
 
 load_dotenv(override=True)
 
 INITIAL_BALANCE = 10_000.0
 SPREAD = 0.002
+SNAPSHOT_EVERY = 100
+# How many times a change is re-validated and retried when another writer updated the account first
+CONFLICT_RETRIES = 5
+
+# How sold shares are matched to their cost: "fifo" (oldest lots first) or "average"
+COST_BASIS_METHOD = os.getenv("COST_BASIS_METHOD", "fifo")
 
 
 class Transaction(BaseModel):
@@ -25,57 +37,435 @@ class Transaction(BaseModel):
         return f"{abs(self.quantity)} shares of {self.symbol} at {self.price} each."
 
 
+class Order(BaseModel):
+    symbol: str
+    side: Literal["buy", "sell"]
+    quantity: int
+    rationale: str
+
+
+class TransactionLog:
+    """
+    Transactions stored column by column: quantities, prices and times in typed arrays, and
+    symbols interned as small integer codes. Indexing and iteration give Transaction views made
+    on demand, records() gives plain dicts, and the numpy properties give whole columns as
+    arrays for analytics. Those are copies, so holding one never stops the log from growing.
+
+    Times are kept as whole seconds since the epoch, reading the account's local times as if they
+    were UTC, and formatted back as "%Y-%m-%d %H:%M:%S". The few timestamps that don't come back
+    the same that way, including those that can't be parsed (NaT), are also kept as given.
+    """
+
+    def __init__(self, records: Iterable[dict] = ()):
+        self._quantities = array("q")
+        self._prices = array("d")
+        self._times = array("q")
+        # Timestamps by index, for those that don't round-trip through _times
+        self._irregular: dict[int, str] = {}
+        self._symbol_codes = array("I")
+        self._rationales: list[str] = []
+        self.symbols: list[str] = []
+        self._codes: dict[str, int] = {}
+        self.extend(records)
+
+    def __len__(self) -> int:
+        return len(self._quantities)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._view(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("transaction index out of range")
+        return self._view(index)
+
+    def __iter__(self):
+        return (self._view(i) for i in range(len(self)))
+
+    def _view(self, i: int) -> "Transaction":
+        # The columns were validated on the way in, so skip validating again
+        return Transaction.model_construct(**self.records(i, i + 1)[0])
+
+    def append(self, transaction: "Transaction | dict"):
+        self.extend([transaction])
+
+    def extend(self, transactions: Iterable["Transaction | dict"]):
+        records = [transaction if isinstance(transaction, dict) else transaction.model_dump() for transaction in transactions]
+        if not records:
+            return
+        for record in records:
+            if record["symbol"] not in self._codes:
+                self._codes[record["symbol"]] = len(self.symbols)
+                self.symbols.append(record["symbol"])
+        self._symbol_codes.extend(self._codes[record["symbol"]] for record in records)
+        self._quantities.extend(record["quantity"] for record in records)
+        self._prices.extend(record["price"] for record in records)
+        timestamps = [record["timestamp"] for record in records]
+        times = _parse_times(timestamps)
+        for i, (timestamp, formatted) in enumerate(zip(timestamps, _format_times(times)), start=len(self._times)):
+            if timestamp != formatted:
+                self._irregular[i] = timestamp
+        self._times.frombytes(times.astype(np.int64).tobytes())
+        self._rationales.extend(record["rationale"] for record in records)
+
+    def records(self, start: int | None = None, stop: int | None = None) -> list[dict]:
+        """ Transactions in [start, stop) as dicts, the same as Transaction.model_dump() gives. """
+        start, stop, _ = slice(start, stop).indices(len(self))
+        if start >= stop:
+            return []
+        symbols = self.symbols
+        timestamps = _format_times(np.array(self._times[start:stop], dtype=np.int64).astype("datetime64[s]"))
+        for i in self._irregular.keys() & range(start, stop):
+            timestamps[i - start] = self._irregular[i]
+        return [
+            {"symbol": symbols[code], "quantity": quantity, "price": price, "timestamp": timestamp, "rationale": rationale}
+            for code, quantity, price, timestamp, rationale in zip(
+                self._symbol_codes[start:stop], self._quantities[start:stop], self._prices[start:stop],
+                timestamps, self._rationales[start:stop])
+        ]
+
+    # Columns are copied rather than viewed with np.frombuffer: a live view would make the
+    # next extend() fail with BufferError, after the trade it records was already committed
+
+    @property
+    def quantities(self) -> np.ndarray:
+        return np.array(self._quantities, dtype=np.int64)
+
+    @property
+    def prices(self) -> np.ndarray:
+        return np.array(self._prices, dtype=np.float64)
+
+    @property
+    def times(self) -> np.ndarray:
+        """ Seconds since the epoch, as datetime64[s] would store them; NaT for unparseable times. """
+        return np.array(self._times, dtype=np.int64)
+
+    @property
+    def symbol_codes(self) -> np.ndarray:
+        """ Index into symbols for each transaction. """
+        return np.array(self._symbol_codes, dtype=np.uint32)
+
+    def dates(self) -> np.ndarray:
+        """ Each transaction's date as a "YYYY-MM-DD" string. """
+        return self.times.astype("datetime64[s]").astype("datetime64[D]").astype(str)
+
+    def totals(self) -> np.ndarray:
+        """ Quantity times price for every transaction, like Transaction.total(). """
+        return self.quantities * self.prices
+
+
+def _parse_times(timestamps: list[str]) -> np.ndarray:
+    """ Timestamps as datetime64[s], parsed all at once when they are all ISO-like, else one by one. """
+    try:
+        # numpy only warns about UTC offsets, converting them; treat that as unparseable here
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            return np.array(timestamps, dtype="datetime64[s]")
+    except (ValueError, Warning):
+        return np.array([_parse_time(timestamp) for timestamp in timestamps], dtype="datetime64[s]")
+
+
+def _format_times(times: np.ndarray) -> list[str]:
+    """ datetime64[s] times as "%Y-%m-%d %H:%M:%S" strings, with "NaT" for NaT. """
+    return [text if text == "NaT" else text.replace("T", " ") for text in np.datetime_as_string(times, unit="s").tolist()]
+
+
+def _parse_time(timestamp: str) -> np.datetime64:
+    try:
+        return np.datetime64(datetime.fromisoformat(timestamp).replace(tzinfo=None), "s")
+    except (TypeError, ValueError):
+        return np.datetime64("NaT")
+
+
+def retry_on_conflict(method):
+    """ Re-run an Account method against the latest state if another writer changed the ledger first. """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        for attempt in range(CONFLICT_RETRIES):
+            try:
+                return method(self, *args, **kwargs)
+            except LedgerConflict as conflict:
+                if attempt == CONFLICT_RETRIES - 1:
+                    raise
+                self._catch_up(conflict.latest_id)
+    return wrapper
+
+
+def _with_fields(data: str, fields: dict) -> str:
+    """ Add fields to a serialized json object without serializing it again. """
+    return data[:-1] + ", " + json.dumps(fields)[1:]
+
+
 class Account(BaseModel):
     name: str
     balance: float
     strategy: str
     holdings: dict[str, int]
-    transactions: list[Transaction]
-    portfolio_value_time_series: list[tuple[str, float]]
+    cost_basis: dict[str, float] = {}
+    lots: dict[str, list[tuple[int, float]]] = {}
+    realized_pnl: float = 0.0
+
+    _ledger_id: int = PrivateAttr(default=0)
+    _unsnapshotted: int = PrivateAttr(default=0)
+    _pending: list[tuple[str, dict]] = PrivateAttr(default_factory=list)
+    _write_behind: bool = PrivateAttr(default=False)
+    _write_behind_trades: bool = PrivateAttr(default=False)
+    # Bumped on every change, so cached reports know when to rebuild
+    _revision: int = PrivateAttr(default=0)
+    _report_cache: dict = PrivateAttr(default_factory=dict)
+    # Loaded from the ledger on first access; None until then
+    _transactions: TransactionLog | None = PrivateAttr(default=None)
+
+    @property
+    def transactions(self) -> TransactionLog:
+        """ The account's trades, oldest first, read from the ledger the first time they are needed. """
+        if self._transactions is None:
+            trades = [data for _, _, data in read_ledger(self.name, types=("trade",), up_to_id=self._ledger_id)]
+            self._transactions = TransactionLog(trades + self._pending_trades())
+        return self._transactions
+
+    @property
+    def transaction_count(self) -> int:
+        if self._transactions is not None:
+            return len(self._transactions)
+        return count_ledger(self.name, ("trade",), up_to_id=self._ledger_id) + len(self._pending_trades())
+
+    def _pending_trades(self) -> list[dict]:
+        return [data for type, data in self._pending if type == "trade"]
+
+    def _add_transactions(self, transactions: list[Transaction | dict]):
+        # If the list hasn't been loaded yet, loading it will pick these up from the ledger or pending events
+        if self._transactions is not None:
+            self._transactions.extend(transactions)
 
     @classmethod
     def get(cls, name: str):
-        fields = read_account(name.lower())
+        """ Load an account from its latest snapshot and the ledger events since. Transactions are loaded on first use. """
+        name = name.lower()
+        snapshot = read_snapshot(name) or cls._create(name)
+        ledger_id, fields = snapshot
+        series = fields.pop("portfolio_value_time_series", None)
+        if series:
+            # Valuations used to live inside the account document; move them to their own table
+            write_valuations(name, series)
+            write_snapshot(name, ledger_id, fields)
+        fields.pop("transactions", None)
+        account = cls(**fields)
+        account._ledger_id = ledger_id
+        if "realized_pnl" not in fields:
+            # Snapshot predates cost tracking, so rebuild it once from the trades it covers
+            for event_id, _, data in read_ledger(name, types=("trade",)):
+                if event_id <= ledger_id:
+                    account._apply_cost(data["symbol"], data["quantity"], data["price"])
+        # Replay only the events written since the latest snapshot
+        for event_id, type, data in read_ledger(name, after_id=ledger_id):
+            account._apply(type, data)
+            account._ledger_id = event_id
+            account._unsnapshotted += 1
+        return account
+
+    @classmethod
+    def _create(cls, name: str) -> tuple[int, dict]:
+        """ Start a ledger for a new account, importing the legacy account blob if there is one. """
+        fields = read_account(name)
         if not fields:
             fields = {
-                "name": name.lower(),
+                "name": name,
                 "balance": INITIAL_BALANCE,
                 "strategy": "",
                 "holdings": {},
-                "transactions": [],
-                "portfolio_value_time_series": []
+                "transactions": []
             }
-            write_account(name, fields)
-        return cls(**fields)
-    
-    
+        ledger_id = 0
+        transactions = fields.pop("transactions")
+        try:
+            with database_transaction():
+                if transactions:
+                    ledger_id = append_ledger_many(name, [("trade", transaction) for transaction in transactions], expected_id=0)
+                write_snapshot(name, ledger_id, fields)
+        except LedgerConflict:
+            # Another process imported the account first
+            return read_snapshot(name)
+        return ledger_id, fields
+
+    def _apply(self, type: str, data: dict):
+        """ Apply a ledger event to the balance, holdings and strategy. """
+        self._revision += 1
+        if type == "trade":
+            symbol, quantity = data["symbol"], data["quantity"]
+            self.holdings[symbol] = self.holdings.get(symbol, 0) + quantity
+            if self.holdings[symbol] == 0:
+                del self.holdings[symbol]
+            self.balance -= quantity * data["price"]
+            self._apply_cost(symbol, quantity, data["price"])
+        elif type == "deposit":
+            self.balance += data["amount"]
+        elif type == "withdraw":
+            self.balance -= data["amount"]
+        elif type == "strategy":
+            self.strategy = data["strategy"]
+
+    def _apply_cost(self, symbol: str, quantity: int, price: float):
+        """ Update open lots, cost basis and realized P&L for one trade. """
+        lots = self.lots.setdefault(symbol, [])
+        if quantity > 0:
+            if COST_BASIS_METHOD == "average" and lots:
+                held, average = lots[0]
+                lots[0] = (held + quantity, (held * average + quantity * price) / (held + quantity))
+            else:
+                lots.append((quantity, price))
+            self.cost_basis[symbol] = self.cost_basis.get(symbol, 0.0) + quantity * price
+            return
+        remaining, cost = -quantity, 0.0
+        while remaining and lots:
+            held, lot_price = lots[0]
+            used = min(held, remaining)
+            cost += used * lot_price
+            remaining -= used
+            if used == held:
+                lots.pop(0)
+            else:
+                lots[0] = (held - used, lot_price)
+        self.realized_pnl += -quantity * price - cost
+        if lots:
+            self.cost_basis[symbol] -= cost
+        else:
+            del self.lots[symbol]
+            self.cost_basis.pop(symbol, None)
+
+    def _record(self, type: str, data: dict):
+        """ Apply an event and append it to the ledger, snapshotting every SNAPSHOT_EVERY events. """
+        self._record_many([(type, data)])
+
+    def _record_many(self, events: list[tuple[str, dict]]):
+        """
+        Append events to the ledger in a single write and apply them, unless writes are deferred.
+        The write only succeeds if nobody else has written since this account last caught up;
+        otherwise LedgerConflict is raised before anything is applied.
+        """
+        trade = any(type == "trade" for type, _ in events)
+        if self._write_behind and (self._write_behind_trades or not trade):
+            for type, data in events:
+                self._apply(type, data)
+            self._pending.extend(events)
+            return
+        # Deferred events already applied here go out in the same write
+        self._append(self._pending + events)
+        self._pending = []
+        for type, data in events:
+            self._apply(type, data)
+        if self._unsnapshotted >= SNAPSHOT_EVERY:
+            self.save()
+
+    def _append(self, events: list[tuple[str, dict]]):
+        self._ledger_id = append_ledger_many(self.name, events, expected_id=self._ledger_id)
+        self._unsnapshotted += len(events)
+
+    def _catch_up(self, latest_id: int):
+        """ Bring this account up to date after a LedgerConflict. """
+        if latest_id >= self._ledger_id and has_ledger_event(self.name, self._ledger_id):
+            self.refresh()
+            return
+        self._reload()
+
+    def _reload(self):
+        # The ledger was reset elsewhere, so start again from the stored state
+        fresh = Account.get(self.name)
+        for field in Account.model_fields:
+            setattr(self, field, getattr(fresh, field))
+        self._ledger_id = fresh._ledger_id
+        self._unsnapshotted = fresh._unsnapshotted
+        self._transactions = None
+        self._revision += 1
+        for type, data in self._pending:
+            self._apply(type, data)
+
+    def set_write_behind(self, enabled: bool, trades: bool = True):
+        """
+        When enabled, events are kept in memory until flush() is called. With trades=False, trades
+        are still written immediately, along with any events held back before them.
+        """
+        self._write_behind = enabled
+        self._write_behind_trades = trades
+        if not enabled:
+            self.flush()
+
+    @property
+    def has_pending_writes(self) -> bool:
+        return bool(self._pending)
+
+    def flush(self, snapshot: bool = True):
+        """ Write pending events to the ledger, snapshotting every SNAPSHOT_EVERY events. """
+        if not self._pending:
+            return
+        # Held-back events were already checked against this account's state when they were made,
+        # so anything other processes wrote in the meantime is applied and they are appended after it
+        for attempt in range(CONFLICT_RETRIES):
+            try:
+                self._append(self._pending)
+                break
+            except LedgerConflict as conflict:
+                if attempt == CONFLICT_RETRIES - 1:
+                    raise
+                self._catch_up(conflict.latest_id)
+        self._pending = []
+        if snapshot and self._unsnapshotted >= SNAPSHOT_EVERY:
+            self.save()
+
+    def refresh(self):
+        """ Apply events written to the ledger by other processes since this account was loaded. """
+        if not has_ledger_event(self.name, self._ledger_id):
+            # Reset elsewhere: later ids continue from the old ones, so they can't be applied on top
+            self._reload()
+            return
+        for event_id, type, data in read_ledger(self.name, after_id=self._ledger_id):
+            self._apply(type, data)
+            if type == "trade":
+                self._add_transactions([data])
+            self._ledger_id = event_id
+            self._unsnapshotted += 1
+
     def save(self):
-        write_account(self.name.lower(), self.model_dump())
+        """ Snapshot the current state so that loads don't need to replay the ledger. """
+        self.flush(snapshot=False)
+        write_snapshot(self.name, self._ledger_id, self.model_dump())
+        self._unsnapshotted = 0
 
     def reset(self, strategy: str):
+        self._pending = []
+        with database_transaction():
+            clear_ledger(self.name)
+            clear_valuations(self.name)
+            write_account_summary(self.name, INITIAL_BALANCE, 0.0, 0.0, 0, {})
         self.balance = INITIAL_BALANCE
         self.strategy = strategy
         self.holdings = {}
-        self.transactions = []
-        self.portfolio_value_time_series = []
+        self._transactions = TransactionLog()
+        self.cost_basis = {}
+        self.lots = {}
+        self.realized_pnl = 0.0
+        self._ledger_id = 0
+        self._revision += 1
         self.save()
 
+    @retry_on_conflict
     def deposit(self, amount: float):
         """ Deposit funds into the account. """
         if amount <= 0:
             raise ValueError("Deposit amount must be positive.")
-        self.balance += amount
+        self._record("deposit", {"amount": amount})
         print(f"Deposited ${amount}. New balance: ${self.balance}")
-        self.save()
 
+    @retry_on_conflict
     def withdraw(self, amount: float):
         """ Withdraw funds from the account, ensuring it doesn't go negative. """
         if amount > self.balance:
             raise ValueError("Insufficient funds for withdrawal.")
-        self.balance -= amount
+        self._record("withdraw", {"amount": amount})
         print(f"Withdrew ${amount}. New balance: ${self.balance}")
-        self.save()
 
+    @retry_on_conflict
     def buy_shares(self, symbol: str, quantity: int, rationale: str) -> str:
         """ Buy shares of a stock if sufficient funds are available. """
         price = get_share_price(symbol)
@@ -87,19 +477,15 @@ class Account(BaseModel):
         elif price==0:
             raise ValueError(f"Unrecognized symbol {symbol}")
         
-        # Update holdings
-        self.holdings[symbol] = self.holdings.get(symbol, 0) + quantity
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        # Record transaction
+        # Record transaction, which updates holdings and balance
         transaction = Transaction(symbol=symbol, quantity=quantity, price=buy_price, timestamp=timestamp, rationale=rationale)
-        self.transactions.append(transaction)
-        
-        # Update balance
-        self.balance -= total_cost
-        self.save()
+        self._record("trade", transaction.model_dump())
         write_log(self.name, "account", f"Bought {quantity} of {symbol}")
-        return "Completed. Latest details:\n" + self.report()
+        self._add_transactions([transaction])
+        return "Completed. Latest details:\n" + self.report_summary()
 
+    @retry_on_conflict
     def sell_shares(self, symbol: str, quantity: int, rationale: str) -> str:
         """ Sell shares of a stock if the user has enough shares. """
         if self.holdings.get(symbol, 0) < quantity:
@@ -107,73 +493,213 @@ class Account(BaseModel):
         
         price = get_share_price(symbol)
         sell_price = price * (1 - SPREAD)
-        total_proceeds = sell_price * quantity
-        
-        # Update holdings
-        self.holdings[symbol] -= quantity
         
-        # If shares are completely sold, remove from holdings
-        if self.holdings[symbol] == 0:
-            del self.holdings[symbol]
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        # Record transaction
+        # Record transaction, which updates holdings and balance
         transaction = Transaction(symbol=symbol, quantity=-quantity, price=sell_price, timestamp=timestamp, rationale=rationale)  # negative quantity for sell
-        self.transactions.append(transaction)
-
-        # Update balance
-        self.balance += total_proceeds
-        self.save()
+        self._record("trade", transaction.model_dump())
         write_log(self.name, "account", f"Sold {quantity} of {symbol}")
-        return "Completed. Latest details:\n" + self.report()
+        self._add_transactions([transaction])
+        return "Completed. Latest details:\n" + self.report_summary()
 
-    def calculate_portfolio_value(self):
-        """ Calculate the total value of the user's portfolio. """
+    @retry_on_conflict
+    def submit_orders(self, orders: list[Order]) -> str:
+        """ Price a batch of orders together and apply all of them, or none if any would fail.
+        Sells are applied before buys so that their proceeds can fund the buys. """
+        if not orders:
+            raise ValueError("No orders given")
+        prices = get_share_prices(order.symbol for order in orders)
+        holdings = dict(self.holdings)
+        balance = self.balance
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        transactions = []
+        for order in sorted(orders, key=lambda order: order.side != "sell"):
+            price = prices[order.symbol]
+            if order.quantity <= 0:
+                raise ValueError(f"Order quantity for {order.symbol} must be positive.")
+            elif price == 0:
+                raise ValueError(f"Unrecognized symbol {order.symbol}")
+            if order.side == "sell":
+                if holdings.get(order.symbol, 0) < order.quantity:
+                    raise ValueError(f"Cannot sell {order.quantity} shares of {order.symbol}. Not enough shares held.")
+                quantity, trade_price = -order.quantity, price * (1 - SPREAD)
+            else:
+                quantity, trade_price = order.quantity, price * (1 + SPREAD)
+                if quantity * trade_price > balance:
+                    raise ValueError(f"Insufficient funds to buy {order.quantity} shares of {order.symbol}; no orders were placed.")
+            holdings[order.symbol] = holdings.get(order.symbol, 0) + quantity
+            balance -= quantity * trade_price
+            transactions.append(Transaction(symbol=order.symbol, quantity=quantity, price=trade_price, timestamp=timestamp, rationale=order.rationale))
+
+        summary = ", ".join(f"{'Bought' if t.quantity > 0 else 'Sold'} {abs(t.quantity)} of {t.symbol}" for t in transactions)
+        self._record_many([("trade", transaction.model_dump()) for transaction in transactions])
+        write_log(self.name, "account", summary)
+        self._add_transactions(transactions)
+        return "Completed. Latest details:\n" + self.report_summary()
+
+    def calculate_portfolio_value(self, prices: dict[str, float] | None = None):
+        """ Calculate the total value of the user's portfolio, at current prices unless prices are given. """
+        prices = prices if prices is not None else get_share_prices(self.holdings)
         total_value = self.balance
         for symbol, quantity in self.holdings.items():
-            total_value += get_share_price(symbol) * quantity
+            total_value += prices[symbol] * quantity
         return total_value
 
     def calculate_profit_loss(self, portfolio_value: float):
-        """ Calculate profit or loss from the initial spend. """
-        initial_spend = sum(transaction.total() for transaction in self.transactions)
-        return portfolio_value - initial_spend - self.balance
+        """ Calculate profit or loss from the initial spend: realized P&L plus the gain on open positions. """
+        return self.realized_pnl + portfolio_value - self.balance - sum(self.cost_basis.values())
 
     def get_holdings(self):
         """ Report the current holdings of the user. """
         return self.holdings
 
-    def get_profit_loss(self):
-        """ Report the user's profit or loss at any point in time. """
-        return self.calculate_profit_loss()
+    def get_profit_loss(self) -> dict:
+        """ Report the user's realized, unrealized and total profit or loss at any point in time. """
+        prices = get_share_prices(self.holdings)
+        unrealized = {
+            symbol: prices[symbol] * quantity - self.cost_basis.get(symbol, 0.0)
+            for symbol, quantity in self.holdings.items()
+        }
+        return {
+            "realized": self.realized_pnl,
+            "unrealized": sum(unrealized.values()),
+            "total": self.realized_pnl + sum(unrealized.values()),
+            "unrealized_by_symbol": unrealized,
+        }
+
+    def list_transactions(self, start: int | None = None, limit: int | None = None):
+        """ List the user's transactions, oldest first: all of them, or limit of them from index start
+        (the latest limit when start is None). """
+        if limit is None:
+            return self.transactions.records(start)
+        elif start is None and limit <= 0:
+            return []
+        elif start is None and self._transactions is None:
+            # Read just the latest trades rather than loading them all
+            trades = read_ledger(self.name, types=("trade",), up_to_id=self._ledger_id, last_n=limit)
+            return ([data for _, _, data in trades] + self._pending_trades())[-limit:]
+        elif start is None:
+            return self.transactions.records(-limit)
+        return self.transactions.records(start, start + limit)
+
+    @property
+    def version(self) -> int:
+        """ The id of the latest ledger event reflected in this account, for use with report_delta. """
+        return self._ledger_id
+
+    def _cached(self, key: tuple, build) -> str:
+        """ Return build()'s json for key, reusing it until the account next changes. """
+        if self._report_cache.get("revision") != self._revision:
+            self._report_cache = {"revision": self._revision}
+        if key not in self._report_cache:
+            self._report_cache[key] = json.dumps(build())
+        return self._report_cache[key]
+
+    def _valuation(self) -> dict:
+        """ Value the account at current prices, recording the valuation and the account's leaderboard row. """
+        prices = get_share_prices(self.holdings)
+        portfolio_value = self.calculate_portfolio_value(prices)
+        pnl = self.calculate_profit_loss(portfolio_value)
+        positions = {symbol: (quantity, prices[symbol]) for symbol, quantity in self.holdings.items()}
+        with database_transaction():
+            write_valuations(self.name, [(datetime.now().strftime("%Y-%m-%d %H:%M:%S"), portfolio_value)])
+            write_account_summary(self.name, self.balance, sum(self.cost_basis.values()), self.realized_pnl, self.transaction_count, positions)
+        return {
+            "total_portfolio_value": portfolio_value,
+            "total_profit_loss": pnl,
+            "realized_profit_loss": self.realized_pnl,
+            "unrealized_profit_loss": pnl - self.realized_pnl,
+        }
 
-    def list_transactions(self):
-        """ List all transactions made by the user. """
-        return [transaction.model_dump() for transaction in self.transactions]
-    
     def report(self) -> str:
         """ Return a json string representing the account.  """
-        portfolio_value = self.calculate_portfolio_value()
-        self.portfolio_value_time_series.append((datetime.now().strftime("%Y-%m-%d %H:%M:%S"), portfolio_value))
-        self.save()
-        pnl = self.calculate_profit_loss(portfolio_value)
-        data = self.model_dump()
-        data["total_portfolio_value"] = portfolio_value
-        data["total_profit_loss"] = pnl
+        data = self._cached(("full",), lambda: {**self.model_dump(), "transactions": self.list_transactions()})
         write_log(self.name, "account", f"Retrieved account details")
-        return json.dumps(data)
+        return _with_fields(data, self._valuation())
+
+    def report_summary(self, last_n: int = 5) -> str:
+        """ Return a compact json string with the balance, holdings, profit or loss and the last_n transactions. """
+        data = self._cached(("summary", last_n), lambda: {
+            "name": self.name,
+            "version": self.version,
+            "strategy": self.strategy,
+            "balance": self.balance,
+            "holdings": self.holdings,
+            "transaction_count": self.transaction_count,
+            "recent_transactions": self.list_transactions(limit=last_n),
+        })
+        write_log(self.name, "account", "Retrieved account summary")
+        return _with_fields(data, self._valuation())
+
+    def report_delta(self, version: int) -> str:
+        """
+        Return a json string with what changed since a version from an earlier report: the current
+        balance, holdings, strategy and profit or loss, and the trades made since. "full" is true when
+        the version is 0 or the account was reset after it, so the trades are all of them. Trades
+        still held back in write-behind mode are included once they are written.
+        """
+        def build():
+            data = {
+                "version": self.version,
+                "changed": version != self.version,
+                "full": False,
+                "strategy": self.strategy,
+                "balance": self.balance,
+                "holdings": self.holdings,
+                "transactions": [],
+            }
+            if not data["changed"]:
+                return data
+            events = []
+            if 0 < version < self.version:
+                events = [(event_id, type, event) for event_id, type, event in read_ledger(self.name, after_id=version - 1)
+                          if event_id <= self.version]
+            if not events or events[0][0] != version:
+                # The version's event is gone, so the account was reset since
+                data["full"] = True
+                data["transactions"] = self.list_transactions()
+            else:
+                data["transactions"] = [event for event_id, type, event in events[1:] if type == "trade"]
+            return data
+        data = self._cached(("delta", version), build)
+        return _with_fields(data, self._valuation())
+
+    def report_transactions(self, start: int | None = None, limit: int = 50) -> str:
+        """ Return a json string with one page of transactions, oldest first, and where the next page starts. """
+        def build():
+            total = self.transaction_count
+            first = max(total - limit, 0) if start is None else min(max(start, 0), total)
+            transactions = self.list_transactions(None if start is None else first, limit)
+            return {
+                "version": self.version,
+                "total": total,
+                "start": first,
+                "next": first + len(transactions) if first + len(transactions) < total else None,
+                "transactions": transactions,
+            }
+        return self._cached(("transactions", start, limit), build)
     
+    def get_portfolio_value_time_series(self, start: str | None = None, end: str | None = None, bucket: str | None = None) -> list[tuple[str, float]]:
+        """ Return portfolio valuations in a time window, optionally rolled up by minute, hour or day. """
+        return read_valuations(self.name, start, end, bucket)
+
     def get_strategy(self) -> str:
         """ Return the strategy of the account """
         write_log(self.name, "account", f"Retrieved strategy")
         return self.strategy
     
+    @retry_on_conflict
     def change_strategy(self, strategy: str) -> str:
         """ At your discretion, if you choose to, call this to change your investment strategy for the future """
-        self.strategy = strategy
-        self.save()
+        self._record("strategy", {"strategy": strategy})
         write_log(self.name, "account", f"Changed strategy")
         return "Changed strategy"
 
+def refresh_account_summaries() -> int:
+    """ Reprice every symbol held by any account in one batch and revalue the leaderboard rows that hold them. """
+    symbols = read_held_symbols()
+    return update_position_prices(get_share_prices(symbols)) if symbols else 0
+
 # Example of usage:
 if __name__ == "__main__":
     account = Account("John Doe")
@@ -183,4 +709,4 @@ if __name__ == "__main__":
     print(f"Current Holdings: {account.get_holdings()}")
     print(f"Total Portfolio Value: {account.calculate_portfolio_value()}")
     print(f"Profit/Loss: {account.get_profit_loss()}")
-    print(f"Transactions: {account.list_transactions()}")
\ No newline at end of file
+    print(f"Transactions: {account.list_transactions()}")
@@ -2,38 +2,185 @@ import mcp
 from mcp.client.stdio import stdio_client
 from mcp import StdioServerParameters
 from agents import FunctionTool
+import asyncio
 import json
+import os
+import time
 
 params = StdioServerParameters(command="uv", args=["run", "accounts_server.py"], env=None)
 
+POOL_SIZE = int(os.getenv("ACCOUNTS_CLIENT_POOL_SIZE", "2"))
+# Sessions idle for longer than this are pinged before reuse
+HEALTH_CHECK_SECONDS = 30
+SESSION_START_TIMEOUT_SECONDS = 60
+
+
+class PooledSession:
+    """A warm accounts_server process with an initialized session, held open by its own task."""
+
+    def __init__(self):
+        self.session: mcp.ClientSession | None = None
+        self.last_used = 0.0
+        self.error: Exception | None = None
+        self._ready = asyncio.Event()
+        self._closed = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    async def start(self):
+        self._task = asyncio.create_task(self._run())
+        await asyncio.wait_for(self._ready.wait(), SESSION_START_TIMEOUT_SECONDS)
+        if not self.session:
+            raise RuntimeError(f"Could not start accounts_server: {self.error}")
+        self.last_used = time.monotonic()
+
+    async def _run(self):
+        # stdio_client must be entered and exited in the same task, so the session lives here
+        try:
+            async with stdio_client(params) as streams:
+                async with mcp.ClientSession(*streams) as session:
+                    await session.initialize()
+                    self.session = session
+                    self._ready.set()
+                    await self._closed.wait()
+        except Exception as e:
+            self.error = e
+        finally:
+            self.session = None
+            self._ready.set()
+
+    @property
+    def alive(self) -> bool:
+        return self.session is not None and self._task is not None and not self._task.done()
+
+    async def healthy(self) -> bool:
+        if not self.alive:
+            return False
+        if time.monotonic() - self.last_used < HEALTH_CHECK_SECONDS:
+            return True
+        try:
+            await asyncio.wait_for(self.session.send_ping(), 5)
+            return True
+        except Exception:
+            return False
+
+    async def close(self):
+        self._closed.set()
+        if self._task:
+            await asyncio.gather(self._task, return_exceptions=True)
+
+
+class AccountsClientPool:
+    """
+    A small pool of long-lived accounts_server sessions. Servers are started lazily up to
+    size, health-checked on checkout and restarted if their process has died.
+    """
+
+    def __init__(self, size: int = POOL_SIZE):
+        self.size = size
+        self.loop = asyncio.get_running_loop()
+        self._idle: asyncio.Queue[PooledSession] = asyncio.Queue()
+        self._started = 0
+        self._tools = None
+
+    async def _restart(self, pooled: PooledSession) -> PooledSession:
+        await pooled.close()
+        fresh = PooledSession()
+        try:
+            await fresh.start()
+        except Exception:
+            # Keep the slot; the next checkout will try to start it again
+            self._idle.put_nowait(fresh)
+            raise
+        return fresh
+
+    async def _acquire(self) -> PooledSession:
+        if self._idle.empty() and self._started < self.size:
+            self._started += 1
+            pooled = PooledSession()
+            try:
+                await pooled.start()
+            except Exception:
+                self._started -= 1
+                raise
+            return pooled
+        pooled = await self._idle.get()
+        if not await pooled.healthy():
+            pooled = await self._restart(pooled)
+        return pooled
+
+    def _release(self, pooled: PooledSession):
+        pooled.last_used = time.monotonic()
+        self._idle.put_nowait(pooled)
+
+    async def run(self, operation):
+        """Await operation(session) on a pooled session, retrying once on a fresh server if the process died."""
+        pooled = await self._acquire()
+        restarting = False
+        try:
+            try:
+                return await operation(pooled.session)
+            except Exception:
+                if pooled.alive:
+                    raise
+                # If the restart fails, _restart has already put the slot back
+                restarting = True
+                pooled = await self._restart(pooled)
+                restarting = False
+                return await operation(pooled.session)
+        finally:
+            if not restarting:
+                self._release(pooled)
+
+    async def list_tools(self):
+        if self._tools is None:
+            self._tools = (await self.run(lambda session: session.list_tools())).tools
+        return self._tools
+
+    async def close(self):
+        while not self._idle.empty():
+            await self._idle.get_nowait().close()
+        self._started = 0
+
+
+_pool: AccountsClientPool | None = None
+
+
+def get_pool() -> AccountsClientPool:
+    """Return the pool for the running event loop, creating it on first use."""
+    global _pool
+    if _pool is None or _pool.loop is not asyncio.get_running_loop():
+        _pool = AccountsClientPool()
+    return _pool
+
+
+async def close_accounts_client():
+    global _pool
+    if _pool:
+        await _pool.close()
+        _pool = None
+
 
 async def list_accounts_tools():
-    async with stdio_client(params) as streams:
-        async with mcp.ClientSession(*streams) as session:
-            await session.initialize()
-            tools_result = await session.list_tools()
-            return tools_result.tools
-        
+    return await get_pool().list_tools()
+
 async def call_accounts_tool(tool_name, tool_args):
-    async with stdio_client(params) as streams:
-        async with mcp.ClientSession(*streams) as session:
-            await session.initialize()
-            result = await session.call_tool(tool_name, tool_args)
-            return result
-            
+    return await get_pool().run(lambda session: session.call_tool(tool_name, tool_args))
+
 async def read_accounts_resource(name):
-    async with stdio_client(params) as streams:
-        async with mcp.ClientSession(*streams) as session:
-            await session.initialize()
-            result = await session.read_resource(f"accounts://accounts_server/{name}")
-            return result.contents[0].text
-        
+    result = await get_pool().run(lambda session: session.read_resource(f"accounts://accounts_server/{name}"))
+    return result.contents[0].text
+
+async def read_account_summary_resource(name):
+    result = await get_pool().run(lambda session: session.read_resource(f"accounts://summary/{name}"))
+    return result.contents[0].text
+
+async def read_leaderboard_resource():
+    result = await get_pool().run(lambda session: session.read_resource("accounts://leaderboard"))
+    return result.contents[0].text
+
 async def read_strategy_resource(name):
-    async with stdio_client(params) as streams:
-        async with mcp.ClientSession(*streams) as session:
-            await session.initialize()
-            result = await session.read_resource(f"accounts://strategy/{name}")
-            return result.contents[0].text
+    result = await get_pool().run(lambda session: session.read_resource(f"accounts://strategy/{name}"))
+    return result.contents[0].text
 
 async def get_accounts_tools_openai():
     openai_tools = []
@@ -44,7 +191,7 @@ async def get_accounts_tools_openai():
             description=tool.description,
             params_json_schema=schema,
             on_invoke_tool=lambda ctx, args, toolname=tool.name: call_accounts_tool(toolname, json.loads(args))
-                
+
         )
         openai_tools.append(openai_tool)
-    return openai_tools
\ No newline at end of file
+    return openai_tools
\ No newline at end of file
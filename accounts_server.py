@@ -1,7 +1,55 @@
 from mcp.server.fastmcp import FastMCP
-from accounts import Account
+from contextlib import asynccontextmanager
+import asyncio
+import json
+import os
+from accounts import Order, refresh_account_summaries
+from account_cache import AccountCache
+from async_database import read_valuations, compact_logs, read_leaderboard, run_write
 
-mcp = FastMCP("accounts_server")
+LOG_COMPACT_INTERVAL_SECONDS = float(os.getenv("LOG_COMPACT_INTERVAL_SECONDS", "3600"))
+# How often held positions are repriced for the leaderboard; trades and reports update it as they happen
+LEADERBOARD_REFRESH_SECONDS = float(os.getenv("LEADERBOARD_REFRESH_SECONDS", "60"))
+
+accounts = AccountCache()
+
+
+async def compact_logs_periodically(interval: float = LOG_COMPACT_INTERVAL_SECONDS):
+    while True:
+        try:
+            await compact_logs()
+        except Exception as e:
+            print(f"Could not compact logs: {e}")
+        await asyncio.sleep(interval)
+
+
+async def refresh_leaderboard_periodically(interval: float = LEADERBOARD_REFRESH_SECONDS):
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await run_write(refresh_account_summaries)
+        except Exception as e:
+            print(f"Could not refresh the leaderboard: {e}")
+
+
+@asynccontextmanager
+async def flush_accounts(server: FastMCP):
+    """ Write account changes behind on a timer while serving, and once more on shutdown.
+    Old log entries are rolled into daily summaries and the leaderboard is repriced on timers too. """
+    tasks = [
+        asyncio.create_task(accounts.flush_periodically()),
+        asyncio.create_task(compact_logs_periodically()),
+        asyncio.create_task(refresh_leaderboard_periodically()),
+    ]
+    try:
+        yield
+    finally:
+        for task in tasks:
+            task.cancel()
+        await accounts.aflush()
+
+
+mcp = FastMCP("accounts_server", lifespan=flush_accounts)
 
 @mcp.tool()
 async def get_balance(name: str) -> float:
@@ -10,7 +58,7 @@ async def get_balance(name: str) -> float:
     Args:
         name: The name of the account holder
     """
-    return Account.get(name).balance
+    return (await accounts.aget(name)).balance
 
 @mcp.tool()
 async def get_holdings(name: str) -> dict[str, int]:
@@ -19,10 +67,63 @@ async def get_holdings(name: str) -> dict[str, int]:
     Args:
         name: The name of the account holder
     """
-    return Account.get(name).holdings
+    return (await accounts.aget(name)).holdings
+
+@mcp.tool()
+async def get_profit_loss(name: str) -> dict:
+    """Get the realized, unrealized and total profit or loss of the given account name.
+
+    Args:
+        name: The name of the account holder
+    """
+    return await accounts.run(name, lambda account: account.get_profit_loss())
+
+@mcp.tool()
+async def get_account_summary(name: str, last_n: int = 5) -> str:
+    """Get a compact summary of the given account: balance, holdings, profit or loss and the most recent transactions.
+
+    Args:
+        name: The name of the account holder
+        last_n: How many of the most recent transactions to include
+    """
+    return await accounts.run(name, lambda account: account.report_summary(last_n))
+
+@mcp.tool()
+async def get_account_changes(name: str, version: int) -> str:
+    """Get what changed in the given account since an earlier report: current balance, holdings, strategy
+    and profit or loss, plus the transactions made since. Pass the version from the earlier report.
+
+    Args:
+        name: The name of the account holder
+        version: The version returned by an earlier summary, report or change listing; 0 for everything
+    """
+    return await accounts.run(name, lambda account: account.report_delta(version))
+
+@mcp.tool()
+async def list_transactions(name: str, start: int = -1, limit: int = 50) -> str:
+    """List the given account's transactions one page at a time, oldest first.
+
+    Args:
+        name: The name of the account holder
+        start: Index of the first transaction; -1 for the most recent page
+        limit: The maximum number of transactions to return
+    """
+    return await accounts.run(name, lambda account: account.report_transactions(None if start < 0 else start, limit))
+
+@mcp.tool()
+async def get_portfolio_value_history(name: str, start: str = "", end: str = "", bucket: str = "") -> list[tuple[str, float]]:
+    """Get the portfolio value of the given account name over a time window.
+
+    Args:
+        name: The name of the account holder
+        start: Optional start of the window, e.g. "2025-01-01 00:00:00"
+        end: Optional end of the window (exclusive)
+        bucket: Optional rollup of "minute", "hour" or "day"; leave empty for every recorded value
+    """
+    return await read_valuations(name, start or None, end or None, bucket or None)
 
 @mcp.tool()
-async def buy_shares(name: str, symbol: str, quantity: int, rationale: str) -> float:
+async def buy_shares(name: str, symbol: str, quantity: int, rationale: str) -> str:
     """Buy shares of a stock.
 
     Args:
@@ -31,11 +132,11 @@ async def buy_shares(name: str, symbol: str, quantity: int, rationale: str) -> f
         quantity: The quantity of shares to buy
         rationale: The rationale for the purchase and fit with the account's strategy
     """
-    return Account.get(name).buy_shares(symbol, quantity, rationale)
+    return await accounts.run(name, lambda account: account.buy_shares(symbol, quantity, rationale), trade=True)
 
 
 @mcp.tool()
-async def sell_shares(name: str, symbol: str, quantity: int, rationale: str) -> float:
+async def sell_shares(name: str, symbol: str, quantity: int, rationale: str) -> str:
     """Sell shares of a stock.
 
     Args:
@@ -44,7 +145,18 @@ async def sell_shares(name: str, symbol: str, quantity: int, rationale: str) ->
         quantity: The quantity of shares to sell
         rationale: The rationale for the sale and fit with the account's strategy
     """
-    return Account.get(name).sell_shares(symbol, quantity, rationale)
+    return await accounts.run(name, lambda account: account.sell_shares(symbol, quantity, rationale), trade=True)
+
+@mcp.tool()
+async def submit_orders(name: str, orders: list[Order]) -> str:
+    """Buy and sell several stocks in one step, for example to rebalance. All orders are priced together
+    and either all are executed or none are. Sells are executed before buys, so their proceeds can fund the buys.
+
+    Args:
+        name: The name of the account holder
+        orders: The orders, each with a symbol, side ("buy" or "sell"), quantity and rationale
+    """
+    return await accounts.run(name, lambda account: account.submit_orders(orders), trade=True)
 
 @mcp.tool()
 async def change_strategy(name: str, strategy: str) -> str:
@@ -54,17 +166,34 @@ async def change_strategy(name: str, strategy: str) -> str:
         name: The name of the account holder
         strategy: The new strategy for the account
     """
-    return Account.get(name).change_strategy(strategy)
+    return await accounts.run(name, lambda account: account.change_strategy(strategy), changed=True)
+
+@mcp.tool()
+async def get_leaderboard(order_by: str = "profit_loss", limit: int = 10) -> list[dict]:
+    """Rank all accounts, best first, with each one's balance, holdings value, portfolio value,
+    profit or loss and trade count.
+
+    Args:
+        order_by: What to rank by: "profit_loss", "portfolio_value", "balance", "realized_pnl" or "trade_count"
+        limit: How many accounts to return
+    """
+    return await read_leaderboard(order_by, limit)
+
+@mcp.resource("accounts://leaderboard")
+async def read_leaderboard_resource() -> str:
+    return json.dumps(await read_leaderboard())
 
 @mcp.resource("accounts://accounts_server/{name}")
 async def read_account_resource(name: str) -> str:
-    account = Account.get(name.lower())
-    return account.report()
+    return await accounts.run(name, lambda account: account.report())
+
+@mcp.resource("accounts://summary/{name}")
+async def read_account_summary_resource(name: str) -> str:
+    return await accounts.run(name, lambda account: account.report_summary())
 
 @mcp.resource("accounts://strategy/{name}")
 async def read_strategy_resource(name: str) -> str:
-    account = Account.get(name.lower())
-    return account.get_strategy()
+    return await accounts.run(name, lambda account: account.get_strategy())
 
 if __name__ == "__main__":
-    mcp.run(transport='stdio')
\ No newline at end of file
+    mcp.run(transport='stdio')
\ No newline at end of file
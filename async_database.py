@@ -0,0 +1,77 @@
+"""
+Async versions of the database functions, with the same names and arguments.
+
+Writes run one at a time on a dedicated writer thread, in the order they were awaited, and
+at most MAX_PENDING_WRITES may be queued before callers wait. Reads run on a small pool of
+reader threads. Either way the event loop keeps serving other requests while SQLite works.
+"""
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial, wraps
+import database
+
+READER_THREADS = int(os.getenv("DB_READER_THREADS", "4"))
+MAX_PENDING_WRITES = int(os.getenv("DB_MAX_PENDING_WRITES", "100"))
+
+_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-writer")
+_readers = ThreadPoolExecutor(max_workers=READER_THREADS, thread_name_prefix="db-reader")
+_write_slots = asyncio.Semaphore(MAX_PENDING_WRITES)
+
+
+def _reader(function):
+    @wraps(function)
+    async def read(*args, **kwargs):
+        return await asyncio.get_running_loop().run_in_executor(_readers, partial(function, *args, **kwargs))
+    return read
+
+
+def _writer_of(function):
+    @wraps(function)
+    async def write(*args, **kwargs):
+        async with _write_slots:
+            return await asyncio.get_running_loop().run_in_executor(_writer, partial(function, *args, **kwargs))
+    return write
+
+
+async def run_write(function, *args, **kwargs):
+    """Run any blocking function that writes to the database on the writer thread."""
+    return await _writer_of(function)(*args, **kwargs)
+
+
+async def run_read(function, *args, **kwargs):
+    """Run any blocking function that only reads from the database on a reader thread."""
+    return await _reader(function)(*args, **kwargs)
+
+
+write_account = _writer_of(database.write_account)
+read_account = _reader(database.read_account)
+append_ledger = _writer_of(database.append_ledger)
+append_ledger_many = _writer_of(database.append_ledger_many)
+read_ledger = _reader(database.read_ledger)
+count_ledger = _reader(database.count_ledger)
+latest_ledger_id = _reader(database.latest_ledger_id)
+has_ledger_event = _reader(database.has_ledger_event)
+clear_ledger = _writer_of(database.clear_ledger)
+write_snapshot = _writer_of(database.write_snapshot)
+read_snapshot = _reader(database.read_snapshot)
+write_valuations = _writer_of(database.write_valuations)
+read_valuations = _reader(database.read_valuations)
+clear_valuations = _writer_of(database.clear_valuations)
+write_account_summary = _writer_of(database.write_account_summary)
+read_held_symbols = _reader(database.read_held_symbols)
+update_position_prices = _writer_of(database.update_position_prices)
+read_leaderboard = _reader(database.read_leaderboard)
+write_log = _writer_of(database.write_log)
+flush_logs = _reader(database.flush_logs)
+read_log = _reader(database.read_log)
+read_log_since = _reader(database.read_log_since)
+compact_logs = _writer_of(database.compact_logs)
+read_log_summaries = _reader(database.read_log_summaries)
+read_market = _reader(database.read_market)
+write_prices = _writer_of(database.write_prices)
+has_prices = _reader(database.has_prices)
+read_price = _reader(database.read_price)
+read_prices = _reader(database.read_prices)
+read_price_history = _reader(database.read_price_history)
+read_price_range = _reader(database.read_price_range)
@@ -0,0 +1,217 @@
+"""
+Vectorized backtesting over stored daily closes.
+
+Prices are held as a (days, symbols) array and strategies as (strategies, days, symbols)
+arrays, so hundreds of strategies are simulated together with NumPy instead of looping
+over Account objects.
+"""
+from dataclasses import dataclass
+import numpy as np
+from database import read_price_range
+from market import PRICE_SIM_SEED
+from accounts import INITIAL_BALANCE, SPREAD, TransactionLog
+
+TRADING_DAYS_PER_YEAR = 252
+
+
+@dataclass
+class PriceMatrix:
+    dates: list[str]
+    symbols: list[str]
+    prices: np.ndarray  # (days, symbols), NaN before a symbol's first close
+
+
+@dataclass
+class BacktestResult:
+    names: list[str]
+    dates: list[str]
+    equity: np.ndarray  # (strategies, days)
+    cash: np.ndarray  # (strategies, days)
+    holdings: np.ndarray  # (strategies, days, symbols)
+
+    @property
+    def returns(self) -> np.ndarray:
+        """Daily returns, (strategies, days - 1)."""
+        return self.equity[:, 1:] / self.equity[:, :-1] - 1
+
+    @property
+    def drawdown(self) -> np.ndarray:
+        """Fractional distance below the running peak, (strategies, days)."""
+        return self.equity / np.maximum.accumulate(self.equity, axis=1) - 1
+
+    def summary(self) -> list[dict]:
+        """Per-strategy total return, annualized return and volatility, Sharpe and max drawdown."""
+        years = max(len(self.dates) - 1, 1) / TRADING_DAYS_PER_YEAR
+        total_return = self.equity[:, -1] / self.equity[:, 0] - 1
+        annual_return = (1 + total_return) ** (1 / years) - 1
+        returns = self.returns
+        volatility = returns.std(axis=1) * np.sqrt(TRADING_DAYS_PER_YEAR) if returns.shape[1] else np.zeros(len(self.names))
+        mean = returns.mean(axis=1) * TRADING_DAYS_PER_YEAR if returns.shape[1] else np.zeros(len(self.names))
+        sharpe = np.divide(mean, volatility, out=np.zeros_like(mean), where=volatility > 0)
+        max_drawdown = self.drawdown.min(axis=1)
+        return [
+            {
+                "name": name,
+                "final_equity": float(self.equity[i, -1]),
+                "total_return": float(total_return[i]),
+                "annual_return": float(annual_return[i]),
+                "volatility": float(volatility[i]),
+                "sharpe": float(sharpe[i]),
+                "max_drawdown": float(max_drawdown[i]),
+            }
+            for i, name in enumerate(self.names)
+        ]
+
+
+def load_prices(symbols: list[str], start: str | None = None, end: str | None = None) -> PriceMatrix:
+    """
+    Build a price matrix from the prices table. Gaps are filled with the previous close;
+    days before a symbol's first close stay NaN, and the symbol can't be traded on them.
+    """
+    rows = read_price_range(symbols, start, end)
+    dates = sorted({date for date, _, _ in rows})
+    date_index = {date: i for i, date in enumerate(dates)}
+    symbol_index = {symbol: j for j, symbol in enumerate(symbols)}
+    prices = np.full((len(dates), len(symbols)), np.nan)
+    for date, symbol, close in rows:
+        prices[date_index[date], symbol_index[symbol]] = close
+    return PriceMatrix(dates, list(symbols), _fill_gaps(prices))
+
+
+def simulate_prices(symbols: list[str], days: int, seed: int = PRICE_SIM_SEED) -> PriceMatrix:
+    """Seeded geometric Brownian motion closes, for benchmarks without stored history."""
+    rng = np.random.default_rng(seed)
+    start = rng.uniform(10, 500, len(symbols))
+    drift = rng.uniform(-0.05, 0.15, len(symbols))
+    volatility = rng.uniform(0.15, 0.6, len(symbols))
+    dt = 1 / TRADING_DAYS_PER_YEAR
+    log_returns = (drift - volatility**2 / 2) * dt + volatility * np.sqrt(dt) * rng.standard_normal((days, len(symbols)))
+    log_returns[0] = 0
+    prices = np.round(start * np.exp(np.cumsum(log_returns, axis=0)), 2)
+    return PriceMatrix([f"day {day}" for day in range(days)], list(symbols), prices)
+
+
+def _fill_gaps(prices: np.ndarray) -> np.ndarray:
+    # Forward fill only: a close must not be used before the day it was known
+    missing = np.isnan(prices)
+    if not missing.any():
+        return prices
+    index = np.where(missing, 0, np.arange(len(prices))[:, None])
+    np.maximum.accumulate(index, axis=0, out=index)
+    return prices[index, np.arange(prices.shape[1])]
+
+
+def orders_from_transactions(transactions_by_account: list[list], market: PriceMatrix) -> np.ndarray:
+    """
+    Turn Transaction-style records (anything with symbol, quantity and timestamp, as objects
+    or dicts, or an account's TransactionLog) into an order array of shape (accounts, days,
+    symbols). Each order lands on the first trading day on or after its timestamp's date;
+    unknown symbols are ignored.
+    """
+    dates = np.array(market.dates)
+    symbol_index = {symbol: j for j, symbol in enumerate(market.symbols)}
+    orders = np.zeros((len(transactions_by_account), len(dates), len(market.symbols)))
+    for i, transactions in enumerate(transactions_by_account):
+        if isinstance(transactions, TransactionLog):
+            # Columnar history: place every order at once
+            columns = np.array([symbol_index.get(symbol, -1) for symbol in transactions.symbols], dtype=np.int64)
+            j = columns[transactions.symbol_codes] if len(transactions) else np.zeros(0, dtype=np.int64)
+            day = np.searchsorted(dates, transactions.dates())
+            known = (j >= 0) & (day < len(dates))
+            np.add.at(orders[i], (day[known], j[known]), transactions.quantities[known])
+            continue
+        for transaction in transactions:
+            record = transaction if isinstance(transaction, dict) else transaction.model_dump()
+            j = symbol_index.get(record["symbol"])
+            day = np.searchsorted(dates, record["timestamp"][:10])
+            if j is not None and day < len(dates):
+                orders[i, day, j] += record["quantity"]
+    return orders
+
+
+def run_orders(market: PriceMatrix, orders: np.ndarray, names: list[str] | None = None,
+               initial_balance: float = INITIAL_BALANCE, spread: float = SPREAD) -> BacktestResult:
+    """
+    Replay share orders, shape (strategies, days, symbols), filled at each day's close with the
+    same spread as Account. Orders are not checked against cash or holdings, so a negative
+    cash column means the strategy would have been rejected live. Orders for a symbol before
+    its first close are dropped.
+    """
+    tradeable = ~np.isnan(market.prices)
+    prices = np.where(tradeable, market.prices, 0)
+    orders = np.where(tradeable, orders, 0)
+    fill_prices = prices * (1 + spread * np.sign(orders))
+    holdings = np.cumsum(orders, axis=1)
+    cash = initial_balance - np.cumsum((orders * fill_prices).sum(axis=2), axis=1)
+    equity = cash + (holdings * prices).sum(axis=2)
+    names = names or [f"strategy {i}" for i in range(len(orders))]
+    return BacktestResult(names, market.dates, equity, cash, holdings)
+
+
+def run_weights(market: PriceMatrix, weights: np.ndarray, names: list[str] | None = None,
+                initial_balance: float = INITIAL_BALANCE, spread: float = SPREAD,
+                rebalance_every: int = 1) -> BacktestResult:
+    """
+    Rebalance to target portfolio weights, shape (strategies, days, symbols), in whole shares.
+    The loop runs over days only; every strategy and symbol is updated at once. A symbol gets
+    no weight before its first close, so that weight is held as cash.
+    """
+    strategies, days, symbols = weights.shape
+    tradeable = ~np.isnan(market.prices)
+    weights = np.where(tradeable, weights, 0)
+    prices = np.where(tradeable, market.prices, 0)
+    safe_prices = np.where(prices > 0, prices, np.inf)
+    holdings = np.zeros((strategies, days, symbols))
+    cash = np.zeros((strategies, days))
+    position = np.zeros((strategies, symbols))
+    balance = np.full(strategies, float(initial_balance))
+    for day in range(days):
+        if day % rebalance_every == 0:
+            equity = balance + position @ prices[day]
+            target = np.floor(weights[:, day] * equity[:, None] / safe_prices[day] / (1 + spread))
+            trade = target - position
+            balance -= (trade * prices[day] * (1 + spread * np.sign(trade))).sum(axis=1)
+            position = target
+        holdings[:, day] = position
+        cash[:, day] = balance
+    equity = cash + (holdings * prices).sum(axis=2)
+    names = names or [f"strategy {i}" for i in range(strategies)]
+    return BacktestResult(names, market.dates, equity, cash, holdings)
+
+
+def moving_average_weights(market: PriceMatrix, windows: list[int]) -> np.ndarray:
+    """
+    One trend-following strategy per window: hold an equal weight in every symbol whose
+    close is above its trailing moving average, and cash otherwise.
+    """
+    prices = market.prices
+    known = ~np.isnan(prices)
+    cumulative = np.vstack([np.zeros(prices.shape[1]), np.cumsum(np.where(known, prices, 0), axis=0)])
+    observed = np.vstack([np.zeros(prices.shape[1]), np.cumsum(known, axis=0)])
+    weights = np.zeros((len(windows), *prices.shape))
+    for i, window in enumerate(windows):
+        # Only windows with a close on every day have an average
+        average = np.full(prices.shape, np.inf)
+        full = observed[window:] - observed[:-window] == window
+        average[window - 1:] = np.where(full, (cumulative[window:] - cumulative[:-window]) / window, np.inf)
+        signal = known & (prices > average)
+        count = signal.sum(axis=1, keepdims=True)
+        weights[i] = np.divide(signal, count, out=np.zeros(prices.shape), where=count > 0)
+    return weights
+
+
+def buy_and_hold_weights(market: PriceMatrix) -> np.ndarray:
+    """A single equal-weight buy-and-hold strategy."""
+    return np.full((1, *market.prices.shape), 1 / len(market.symbols))
+
+
+if __name__ == "__main__":
+    import time
+    symbols = [f"SIM{i}" for i in range(50)]
+    market = simulate_prices(symbols, days=TRADING_DAYS_PER_YEAR * 5)
+    windows = list(range(5, 205))
+    started = time.perf_counter()
+    result = run_weights(market, moving_average_weights(market, windows), [f"sma {w}" for w in windows], rebalance_every=5)
+    elapsed = time.perf_counter() - started
+    best = max(result.summary(), key=lambda row: row["sharpe"])
+    print(f"Backtested {len(windows)} strategies over {len(market.dates)} days in {elapsed:.2f}s; best: {best}")
@@ -1,14 +1,62 @@
 import sqlite3
 import json
-from datetime import datetime
+import os
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
 from dotenv import load_dotenv
+from log_buffer import LogBuffer
 
 load_dotenv(override=True)
 
 DB = "accounts.db"
 
 
-with sqlite3.connect(DB) as conn:
+BUSY_TIMEOUT_SECONDS = 30
+# Log rows older than this many days are rolled into daily summaries by compact_logs; 0 keeps them all
+LOG_RETENTION_DAYS = int(os.getenv("LOG_RETENTION_DAYS", "30"))
+_local = threading.local()
+
+
+def get_connection() -> sqlite3.Connection:
+    """
+    Get this thread's connection, opening it on first use. Connections are kept open so
+    SQLite's statement cache keeps queries prepared between calls.
+    """
+    if not hasattr(_local, "conn"):
+        conn = sqlite3.connect(DB, timeout=BUSY_TIMEOUT_SECONDS, cached_statements=256, check_same_thread=False)
+        # WAL lets readers carry on while another process writes; NORMAL sync is safe under WAL
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(f'PRAGMA busy_timeout={BUSY_TIMEOUT_SECONDS * 1000}')
+        conn.execute('PRAGMA cache_size=-16000')
+        conn.execute('PRAGMA temp_store=MEMORY')
+        _local.conn = conn
+        _local.depth = 0
+    return _local.conn
+
+
+@contextmanager
+def transaction():
+    """
+    Run the enclosed writes as one transaction with a single commit. Nested uses join the
+    outermost transaction, so e.g. imported trades and their snapshot are committed together.
+    """
+    conn = get_connection()
+    _local.depth += 1
+    try:
+        yield conn
+        if _local.depth == 1:
+            conn.commit()
+    except BaseException:
+        if _local.depth == 1:
+            conn.rollback()
+        raise
+    finally:
+        _local.depth -= 1
+
+
+with transaction() as conn:
     cursor = conn.cursor()
     cursor.execute('CREATE TABLE IF NOT EXISTS accounts (name TEXT PRIMARY KEY, account TEXT)')
     cursor.execute('''
@@ -20,45 +68,451 @@ with sqlite3.connect(DB) as conn:
             message TEXT
         )
     ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_logs_name_datetime ON logs (name, datetime)')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS log_summaries (
+            name TEXT,
+            day TEXT,
+            type TEXT,
+            count INTEGER,
+            first DATETIME,
+            last DATETIME,
+            PRIMARY KEY (name, day, type)
+        ) WITHOUT ROWID
+    ''')
     cursor.execute('CREATE TABLE IF NOT EXISTS market (date TEXT PRIMARY KEY, data TEXT)')
-    conn.commit()
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS prices (
+            date TEXT,
+            symbol TEXT,
+            close REAL,
+            PRIMARY KEY (date, symbol)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_prices_symbol_date ON prices (symbol, date)')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS ledger (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT,
+            datetime DATETIME,
+            type TEXT,
+            data TEXT
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_ledger_name_id ON ledger (name, id)')
+    cursor.execute('CREATE TABLE IF NOT EXISTS snapshots (name TEXT PRIMARY KEY, ledger_id INTEGER, account TEXT)')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS valuations (
+            name TEXT,
+            datetime DATETIME,
+            value REAL,
+            PRIMARY KEY (name, datetime)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS valuation_rollups (
+            name TEXT,
+            bucket TEXT,
+            start DATETIME,
+            open REAL,
+            high REAL,
+            low REAL,
+            close REAL,
+            count INTEGER,
+            PRIMARY KEY (name, bucket, start)
+        ) WITHOUT ROWID
+    ''')
+    # One row per account, kept current on every valuation and price refresh, for leaderboards
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS account_summary (
+            name TEXT PRIMARY KEY,
+            balance REAL,
+            holdings_value REAL,
+            cost REAL,
+            realized_pnl REAL,
+            portfolio_value REAL,
+            profit_loss REAL,
+            trade_count INTEGER,
+            updated DATETIME
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS account_positions (
+            name TEXT,
+            symbol TEXT,
+            quantity INTEGER,
+            price REAL,
+            PRIMARY KEY (name, symbol)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_account_positions_symbol ON account_positions (symbol)')
 
 def write_account(name, account_dict):
     json_data = json.dumps(account_dict)
-    with sqlite3.connect(DB) as conn:
+    with transaction() as conn:
         cursor = conn.cursor()
         cursor.execute('''
             INSERT INTO accounts (name, account)
             VALUES (?, ?)
             ON CONFLICT(name) DO UPDATE SET account=excluded.account
         ''', (name.lower(), json_data))
-        conn.commit()
 
 def read_account(name):
-    with sqlite3.connect(DB) as conn:
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute('SELECT account FROM accounts WHERE name = ?', (name.lower(),))
+    row = cursor.fetchone()
+    return json.loads(row[0]) if row else None
+
+class LedgerConflict(Exception):
+    """ Raised when appending to a ledger that another writer has moved past the expected id. """
+
+    def __init__(self, name: str, expected_id: int, latest_id: int):
+        super().__init__(f"Ledger for {name} is at {latest_id}, expected {expected_id}")
+        self.name = name
+        self.expected_id = expected_id
+        self.latest_id = latest_id
+
+def latest_ledger_id(name: str) -> int:
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute('SELECT COALESCE(MAX(id), 0) FROM ledger WHERE name = ?', (name.lower(),))
+    return cursor.fetchone()[0]
+
+def has_ledger_event(name: str, ledger_id: int) -> bool:
+    """ Whether the account's ledger still holds event ledger_id; False once a reset has cleared it. 0 always exists. """
+    if ledger_id == 0:
+        return True
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute('SELECT 1 FROM ledger WHERE id = ? AND name = ?', (ledger_id, name.lower()))
+    return cursor.fetchone() is not None
+
+def append_ledger(name: str, type: str, data: dict) -> int:
+    """
+    Append an event to the account ledger.
+
+    Args:
+        name (str): The account name
+        type (str): The event type (trade, deposit, withdraw, strategy)
+        data (dict): The event payload
+
+    Returns:
+        int: The id of the new ledger row
+    """
+    with transaction() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT INTO ledger (name, datetime, type, data)
+            VALUES (?, datetime('now'), ?, ?)
+        ''', (name.lower(), type, json.dumps(data)))
+        return cursor.lastrowid
+
+def append_ledger_many(name: str, events: list[tuple[str, dict]], expected_id: int | None = None) -> int:
+    """
+    Append several events to the account ledger in one transaction, so either all or none are stored.
+
+    Args:
+        name (str): The account name
+        events (list): (type, data) tuples to append
+        expected_id (int): If given, only append when this is still the account's latest ledger id
+            (0 for an empty ledger), otherwise raise LedgerConflict
+
+    Returns:
+        int: The id of the last new ledger row, or the latest id if there were no events
+    """
+    name = name.lower()
+    if not events:
+        return latest_ledger_id(name)
+    with transaction() as conn:
+        cursor = conn.cursor()
+        rows = [(name, type, json.dumps(data)) for type, data in events]
+        if expected_id is not None:
+            # A single statement takes the write lock before it reads, so the check and insert are atomic
+            cursor.execute('''
+                INSERT INTO ledger (name, datetime, type, data)
+                SELECT ?, datetime('now'), ?, ?
+                WHERE (SELECT COALESCE(MAX(id), 0) FROM ledger WHERE name = ?) = ?
+            ''', (*rows[0], name, expected_id))
+            if cursor.rowcount == 0:
+                raise LedgerConflict(name, expected_id, latest_ledger_id(name))
+            rows = rows[1:]
+        for row in rows:
+            cursor.execute('''
+                INSERT INTO ledger (name, datetime, type, data)
+                VALUES (?, datetime('now'), ?, ?)
+            ''', row)
+        return cursor.lastrowid
+
+def _ledger_filter(name: str, after_id: int, up_to_id: int | None, types: tuple[str, ...] | None) -> tuple[str, list]:
+    query = 'WHERE name = ? AND id > ?'
+    params = [name.lower(), after_id]
+    if up_to_id is not None:
+        query += ' AND id <= ?'
+        params.append(up_to_id)
+    if types:
+        query += f' AND type IN ({",".join("?" * len(types))})'
+        params.extend(types)
+    return query, params
+
+def read_ledger(name: str, after_id: int = 0, types: tuple[str, ...] | None = None,
+                up_to_id: int | None = None, last_n: int | None = None) -> list[tuple[int, str, dict]]:
+    """
+    Read ledger events for an account in the order they were written.
+
+    Args:
+        name (str): The account name
+        after_id (int): Only return events with an id greater than this
+        types (tuple): Optionally restrict to these event types
+        up_to_id (int): Only return events with an id up to and including this
+        last_n (int): Only return the last n matching events
+
+    Returns:
+        list: A list of tuples containing (id, type, data)
+    """
+    where, params = _ledger_filter(name, after_id, up_to_id, types)
+    conn = get_connection()
+    cursor = conn.cursor()
+    if last_n is None:
+        cursor.execute(f'SELECT id, type, data FROM ledger {where} ORDER BY id', params)
+        rows = cursor.fetchall()
+    else:
+        cursor.execute(f'SELECT id, type, data FROM ledger {where} ORDER BY id DESC LIMIT ?', params + [last_n])
+        rows = cursor.fetchall()[::-1]
+    return [(row[0], row[1], json.loads(row[2])) for row in rows]
+
+def count_ledger(name: str, types: tuple[str, ...] | None = None, up_to_id: int | None = None) -> int:
+    where, params = _ledger_filter(name, 0, up_to_id, types)
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute(f'SELECT COUNT(*) FROM ledger {where}', params)
+    return cursor.fetchone()[0]
+
+def clear_ledger(name: str) -> None:
+    with transaction() as conn:
         cursor = conn.cursor()
-        cursor.execute('SELECT account FROM accounts WHERE name = ?', (name.lower(),))
-        row = cursor.fetchone()
-        return json.loads(row[0]) if row else None
+        cursor.execute('DELETE FROM ledger WHERE name = ?', (name.lower(),))
+        cursor.execute('DELETE FROM snapshots WHERE name = ?', (name.lower(),))
+
+def write_snapshot(name: str, ledger_id: int, account_dict: dict) -> None:
+    """
+    Store the account state as of a ledger id, so loads only replay later events. A snapshot
+    older than the stored one, or of events that have since been cleared, is ignored.
+    """
+    with transaction() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT INTO snapshots (name, ledger_id, account)
+            SELECT ?, ?, ?
+            WHERE ? = 0 OR EXISTS (SELECT 1 FROM ledger WHERE id = ? AND name = ?)
+            ON CONFLICT(name) DO UPDATE SET ledger_id=excluded.ledger_id, account=excluded.account
+            WHERE excluded.ledger_id >= snapshots.ledger_id
+        ''', (name.lower(), ledger_id, json.dumps(account_dict), ledger_id, ledger_id, name.lower()))
+
+def read_snapshot(name: str) -> tuple[int, dict] | None:
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute('SELECT ledger_id, account FROM snapshots WHERE name = ?', (name.lower(),))
+    row = cursor.fetchone()
+    return (row[0], json.loads(row[1])) if row else None
     
+# strftime formats giving the start of each rollup bucket
+ROLLUP_BUCKETS = {
+    "minute": "%Y-%m-%d %H:%M:00",
+    "hour": "%Y-%m-%d %H:00:00",
+    "day": "%Y-%m-%d 00:00:00",
+}
+
+def write_valuations(name: str, points: list[tuple[str, float]]) -> None:
+    """
+    Record portfolio valuations and fold them into the minute, hour and day rollups.
+
+    Args:
+        name (str): The account name
+        points (list): A list of (datetime, value) tuples
+    """
+    name = name.lower()
+    with transaction() as conn:
+        cursor = conn.cursor()
+        cursor.executemany('''
+            INSERT INTO valuations (name, datetime, value)
+            VALUES (?, ?, ?)
+            ON CONFLICT(name, datetime) DO UPDATE SET value=excluded.value
+        ''', [(name, when, value) for when, value in points])
+        cursor.executemany('''
+            INSERT INTO valuation_rollups (name, bucket, start, open, high, low, close, count)
+            VALUES (?, ?, strftime(?, ?), ?, ?, ?, ?, 1)
+            ON CONFLICT(name, bucket, start) DO UPDATE SET
+                high=max(high, excluded.high),
+                low=min(low, excluded.low),
+                close=excluded.close,
+                count=count + 1
+        ''', [(name, bucket, fmt, when, value, value, value, value)
+              for when, value in points for bucket, fmt in ROLLUP_BUCKETS.items()])
+
+def read_valuations(name: str, start: str | None = None, end: str | None = None, bucket: str | None = None) -> list[tuple[str, float]]:
+    """
+    Read portfolio valuations for an account within a time window.
+
+    Args:
+        name (str): The account name
+        start (str): Optional inclusive lower bound, e.g. "2025-01-01 00:00:00"
+        end (str): Optional exclusive upper bound
+        bucket (str): None for raw points, or one of "minute", "hour", "day" for the closing value of each bucket
+
+    Returns:
+        list: A list of (datetime, value) tuples in time order
+    """
+    if bucket:
+        if bucket not in ROLLUP_BUCKETS:
+            raise ValueError(f"Unknown bucket {bucket}; expected one of {list(ROLLUP_BUCKETS)}")
+        query = 'SELECT start, close FROM valuation_rollups WHERE name = ? AND bucket = ?'
+        column = 'start'
+        params = [name.lower(), bucket]
+    else:
+        query = 'SELECT datetime, value FROM valuations WHERE name = ?'
+        column = 'datetime'
+        params = [name.lower()]
+    if start:
+        query += f' AND {column} >= ?'
+        params.append(start)
+    if end:
+        query += f' AND {column} < ?'
+        params.append(end)
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute(query + f' ORDER BY {column}', params)
+    return [(row[0], row[1]) for row in cursor.fetchall()]
+
+def clear_valuations(name: str) -> None:
+    with transaction() as conn:
+        cursor = conn.cursor()
+        cursor.execute('DELETE FROM valuations WHERE name = ?', (name.lower(),))
+        cursor.execute('DELETE FROM valuation_rollups WHERE name = ?', (name.lower(),))
+    
+def write_account_summary(name: str, balance: float, cost: float, realized_pnl: float, trade_count: int,
+                          positions: dict[str, tuple[int, float]]) -> None:
+    """
+    Store an account's leaderboard row and its positions.
+
+    Args:
+        name (str): The account name
+        balance (float): Cash balance
+        cost (float): Total cost basis of the open positions
+        realized_pnl (float): Realized profit or loss
+        trade_count (int): Number of trades made
+        positions (dict): symbol -> (quantity, latest price) for each holding
+    """
+    name = name.lower()
+    holdings_value = sum(quantity * price for quantity, price in positions.values())
+    with transaction() as conn:
+        cursor = conn.cursor()
+        cursor.execute('DELETE FROM account_positions WHERE name = ?', (name,))
+        cursor.executemany('INSERT INTO account_positions (name, symbol, quantity, price) VALUES (?, ?, ?, ?)',
+                           [(name, symbol, quantity, price) for symbol, (quantity, price) in positions.items()])
+        cursor.execute('''
+            INSERT INTO account_summary (name, balance, holdings_value, cost, realized_pnl, portfolio_value, profit_loss, trade_count, updated)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, datetime('now'))
+            ON CONFLICT(name) DO UPDATE SET
+                balance=excluded.balance,
+                holdings_value=excluded.holdings_value,
+                cost=excluded.cost,
+                realized_pnl=excluded.realized_pnl,
+                portfolio_value=excluded.portfolio_value,
+                profit_loss=excluded.profit_loss,
+                trade_count=excluded.trade_count,
+                updated=excluded.updated
+        ''', (name, balance, holdings_value, cost, realized_pnl, balance + holdings_value,
+              realized_pnl + holdings_value - cost, trade_count))
+
+def read_held_symbols() -> list[str]:
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute('SELECT DISTINCT symbol FROM account_positions')
+    return [row[0] for row in cursor.fetchall()]
+
+def update_position_prices(prices: dict[str, float]) -> int:
+    """
+    Revalue every account holding any of these symbols at the new prices.
+
+    Returns:
+        int: The number of accounts revalued
+    """
+    if not prices:
+        return 0
+    symbols = json.dumps(list(prices))
+    held = 'name IN (SELECT name FROM account_positions WHERE symbol IN (SELECT value FROM json_each(?)))'
+    with transaction() as conn:
+        cursor = conn.cursor()
+        cursor.executemany('UPDATE account_positions SET price = ? WHERE symbol = ?',
+                           [(price, symbol) for symbol, price in prices.items()])
+        cursor.execute(f'''
+            UPDATE account_summary SET
+                holdings_value = (SELECT COALESCE(SUM(quantity * price), 0) FROM account_positions p WHERE p.name = account_summary.name),
+                updated = datetime('now')
+            WHERE {held}
+        ''', (symbols,))
+        cursor.execute(f'''
+            UPDATE account_summary SET
+                portfolio_value = balance + holdings_value,
+                profit_loss = realized_pnl + holdings_value - cost
+            WHERE {held}
+        ''', (symbols,))
+        return cursor.rowcount
+
+LEADERBOARD_ORDERS = ("profit_loss", "portfolio_value", "balance", "realized_pnl", "trade_count")
+
+def read_leaderboard(order_by: str = "profit_loss", limit: int | None = None) -> list[dict]:
+    """
+    Rank accounts from their summary rows, best first.
+
+    Args:
+        order_by (str): One of LEADERBOARD_ORDERS
+        limit (int): Optionally return only the top accounts
+
+    Returns:
+        list: A list of dicts with the rank and summary of each account
+    """
+    if order_by not in LEADERBOARD_ORDERS:
+        raise ValueError(f"Cannot rank accounts by {order_by}; use one of {', '.join(LEADERBOARD_ORDERS)}")
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute(f'''
+        SELECT RANK() OVER (ORDER BY {order_by} DESC), name, balance, holdings_value, portfolio_value,
+               profit_loss, realized_pnl, trade_count, updated
+        FROM account_summary
+        ORDER BY {order_by} DESC, name
+        LIMIT ?
+    ''', (-1 if limit is None else limit,))
+    columns = [column[0] for column in cursor.description]
+    columns[0] = "rank"
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+def _insert_logs(rows: list[tuple[str, str, str, str]]) -> None:
+    with transaction() as conn:
+        conn.executemany('''
+            INSERT INTO logs (name, datetime, type, message)
+            VALUES (?, ?, ?, ?)
+        ''', rows)
+
+log_buffer = LogBuffer(_insert_logs)
+
 def write_log(name: str, type: str, message: str):
     """
-    Write a log entry to the logs table.
+    Queue a log entry for the logs table. Entries are written in batches on a background thread.
     
     Args:
         name (str): The name associated with the log
         type (str): The type of log entry
         message (str): The log message
     """
-    now = datetime.now().isoformat()
-    
-    with sqlite3.connect(DB) as conn:
-        cursor = conn.cursor()
-        cursor.execute('''
-            INSERT INTO logs (name, datetime, type, message)
-            VALUES (?, datetime('now'), ?, ?)
-        ''', (name.lower(), type, message))
-        conn.commit()
+    # Stamped now in SQLite's datetime('now') format, rather than when the batch is written
+    now = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+    log_buffer.put((name.lower(), now, type, message))
+
+def flush_logs():
+    """ Wait until every queued log entry has been written. """
+    log_buffer.flush()
 
 def read_log(name: str, last_n=10):
     """
@@ -71,31 +525,162 @@ def read_log(name: str, last_n=10):
     Returns:
         list: A list of tuples containing (datetime, type, message)
     """
-    with sqlite3.connect(DB) as conn:
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT datetime, type, message FROM logs 
-            WHERE name = ? 
-            ORDER BY datetime DESC
-            LIMIT ?
-        ''', (name.lower(), last_n))
-        
-        return reversed(cursor.fetchall())
+    flush_logs()
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT datetime, type, message FROM logs 
+        WHERE name = ? 
+        ORDER BY datetime DESC, id DESC
+        LIMIT ?
+    ''', (name.lower(), last_n))
+    
+    return reversed(cursor.fetchall())
+
+def read_log_since(name: str, since_id: int = 0, limit: int = 100) -> list[tuple[int, str, str, str]]:
+    """
+    Read log entries for a name written after a given entry, oldest first. Pass the id of the
+    last entry returned to get the next page.
+
+    Returns:
+        list: A list of tuples containing (id, datetime, type, message)
+    """
+    flush_logs()
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT id, datetime, type, message FROM logs
+        WHERE name = ? AND id > ?
+        ORDER BY id
+        LIMIT ?
+    ''', (name.lower(), since_id, limit))
+    return cursor.fetchall()
+
+def compact_logs(retention_days: int = LOG_RETENTION_DAYS) -> int:
+    """
+    Roll log entries from before the last retention_days days into one summary row per name,
+    day and type, and delete them.
 
-def write_market(date: str, data: dict) -> None:
-    data_json = json.dumps(data)
-    with sqlite3.connect(DB) as conn:
+    Returns:
+        int: The number of log entries compacted
+    """
+    if retention_days <= 0:
+        return 0
+    flush_logs()
+    with transaction() as conn:
         cursor = conn.cursor()
+        cutoff = cursor.execute("SELECT date('now', ?)", (f"-{retention_days} days",)).fetchone()[0]
         cursor.execute('''
-            INSERT INTO market (date, data)
-            VALUES (?, ?)
-            ON CONFLICT(date) DO UPDATE SET data=excluded.data
-        ''', (date, data_json))
-        conn.commit()
+            INSERT INTO log_summaries (name, day, type, count, first, last)
+            SELECT name, date(datetime), type, COUNT(*), MIN(datetime), MAX(datetime)
+            FROM logs WHERE datetime < ?
+            GROUP BY name, date(datetime), type
+            ON CONFLICT(name, day, type) DO UPDATE SET
+                count = count + excluded.count,
+                first = MIN(first, excluded.first),
+                last = MAX(last, excluded.last)
+        ''', (cutoff,))
+        cursor.execute('DELETE FROM logs WHERE datetime < ?', (cutoff,))
+        return cursor.rowcount
+
+def read_log_summaries(name: str, start: str | None = None, end: str | None = None) -> list[tuple[str, str, int]]:
+    """
+    Read the daily log summaries for a name, optionally between start and end days (inclusive).
+
+    Returns:
+        list: A list of tuples containing (day, type, count)
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT day, type, count FROM log_summaries
+        WHERE name = ? AND day >= ? AND day <= ?
+        ORDER BY day, type
+    ''', (name.lower(), start or "", end or "9999-12-31"))
+    return cursor.fetchall()
 
 def read_market(date: str) -> dict | None:
-    with sqlite3.connect(DB) as conn:
+    """Read a legacy per-date market blob; new data is stored in the prices table."""
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute('SELECT data FROM market WHERE date = ?', (date,))
+    row = cursor.fetchone()
+    return json.loads(row[0]) if row else None
+
+def write_prices(rows) -> None:
+    """
+    Bulk upsert closing prices in a single transaction.
+
+    Args:
+        rows: An iterable of (date, symbol, close) tuples
+    """
+    with transaction() as conn:
         cursor = conn.cursor()
-        cursor.execute('SELECT data FROM market WHERE date = ?', (date,))
-        row = cursor.fetchone()
-        return json.loads(row[0]) if row else None
\ No newline at end of file
+        cursor.executemany('''
+            INSERT INTO prices (date, symbol, close)
+            VALUES (?, ?, ?)
+            ON CONFLICT(date, symbol) DO UPDATE SET close=excluded.close
+        ''', rows)
+
+def has_prices(date: str) -> bool:
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute('SELECT 1 FROM prices WHERE date = ? LIMIT 1', (date,))
+    return cursor.fetchone() is not None
+
+def read_price(date: str, symbol: str) -> float | None:
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute('SELECT close FROM prices WHERE date = ? AND symbol = ?', (date, symbol))
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+def read_prices(date: str, symbols: list[str]) -> dict[str, float]:
+    """Read the closing prices of several symbols on one date; unknown symbols are omitted."""
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute(f'''
+        SELECT symbol, close FROM prices
+        WHERE date = ? AND symbol IN ({",".join("?" * len(symbols))})
+    ''', (date, *symbols))
+    return dict(cursor.fetchall())
+
+def read_price_history(symbol: str, start: str | None = None, end: str | None = None) -> list[tuple[str, float]]:
+    """
+    Read the closing prices of a symbol over a date range.
+
+    Args:
+        symbol (str): The ticker
+        start (str): Optional inclusive start date, YYYY-MM-DD
+        end (str): Optional inclusive end date, YYYY-MM-DD
+
+    Returns:
+        list: A list of (date, close) tuples in date order
+    """
+    query = 'SELECT date, close FROM prices WHERE symbol = ?'
+    params = [symbol]
+    if start:
+        query += ' AND date >= ?'
+        params.append(start)
+    if end:
+        query += ' AND date <= ?'
+        params.append(end)
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute(query + ' ORDER BY date', params)
+    return cursor.fetchall()
+
+def read_price_range(symbols: list[str], start: str | None = None, end: str | None = None) -> list[tuple[str, str, float]]:
+    """Read (date, symbol, close) rows for several symbols over an inclusive date range, in date order."""
+    query = f'SELECT date, symbol, close FROM prices WHERE symbol IN ({",".join("?" * len(symbols))})'
+    params = list(symbols)
+    if start:
+        query += ' AND date >= ?'
+        params.append(start)
+    if end:
+        query += ' AND date <= ?'
+        params.append(end)
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute(query + ' ORDER BY date', params)
+    return cursor.fetchall()
\ No newline at end of file
@@ -1,6 +1,6 @@
 import gradio as gr
 import pandas as pd
-from database import get_all_stats_today, read_logs, read_jobs, read_job_stats
+from database import get_all_stats_today, read_logs, read_map_tiles, read_job_stats
 from datetime import datetime, timedelta
 import plotly.graph_objects as go
 import plotly.express as px
@@ -113,37 +113,15 @@ def create_location_map():
     """Create map of job locations"""
     today = datetime.now().date().strftime("%Y-%m-%d")
     
-    # Aggregate all jobs from all categories
-    all_jobs = []
-    for category in ["Business Analyst", "Data Analyst", "Software Engineer", "Product Manager"]:
-        jobs = read_jobs(category, today)
-        if jobs:
-            all_jobs.extend(jobs)
+    # Postings per grid cell, aggregated as they were ingested
+    tiles = read_map_tiles(today)
     
-    if not all_jobs:
+    if not tiles:
         fig = go.Figure()
         fig.add_annotation(text="No location data available", showarrow=False, font=dict(size=20))
         return fig
     
-    # Count jobs by location
-    location_data = {}
-    for job in all_jobs:
-        lat = job.get("latitude")
-        lon = job.get("longitude")
-        loc_name = job.get("location", "Unknown")
-        
-        if lat and lon:
-            key = (lat, lon, loc_name)
-            if key not in location_data:
-                location_data[key] = {"lat": lat, "lon": lon, "location": loc_name, "count": 0}
-            location_data[key]["count"] += 1
-    
-    if not location_data:
-        fig = go.Figure()
-        fig.add_annotation(text="No geographic data available", showarrow=False, font=dict(size=20))
-        return fig
-    
-    df = pd.DataFrame(location_data.values())
+    df = pd.DataFrame(tiles)
     
     fig = px.scatter_geo(df,
                           lat='lat',
@@ -0,0 +1,66 @@
+"""
+Async versions of the database functions, with the same names and arguments.
+
+Writes run one at a time on a dedicated writer thread, in the order they were awaited, and
+at most MAX_PENDING_WRITES may be queued before callers wait. Reads run on a small pool of
+reader threads, each with its own thread-local connection.
+"""
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial, wraps
+import database
+
+READER_THREADS = int(os.getenv("DB_READER_THREADS", "4"))
+MAX_PENDING_WRITES = int(os.getenv("DB_MAX_PENDING_WRITES", "100"))
+
+_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-writer")
+_readers = ThreadPoolExecutor(max_workers=READER_THREADS, thread_name_prefix="db-reader")
+_write_slots = asyncio.Semaphore(MAX_PENDING_WRITES)
+
+
+def _reader(function):
+    @wraps(function)
+    async def read(*args, **kwargs):
+        return await asyncio.get_running_loop().run_in_executor(_readers, partial(function, *args, **kwargs))
+    return read
+
+
+def _writer_of(function):
+    @wraps(function)
+    async def write(*args, **kwargs):
+        async with _write_slots:
+            return await asyncio.get_running_loop().run_in_executor(_writer, partial(function, *args, **kwargs))
+    return write
+
+
+async def run_write(function, *args, **kwargs):
+    """Run any blocking function that writes to the database on the writer thread."""
+    return await _writer_of(function)(*args, **kwargs)
+
+
+async def run_read(function, *args, **kwargs):
+    """Run any blocking function that only reads from the database on a reader thread."""
+    return await _reader(function)(*args, **kwargs)
+
+
+read_jobs = _reader(database.read_jobs)
+ingest_jobs = _writer_of(database.ingest_jobs)
+rebuild_job_stats = _writer_of(database.rebuild_job_stats)
+read_category_stats = _reader(database.read_category_stats)
+search_postings = _reader(database.search_postings)
+read_posting = _reader(database.read_posting)
+search_postings_near = _reader(database.search_postings_near)
+read_map_tiles = _reader(database.read_map_tiles)
+search_postings_text = _reader(database.search_postings_text)
+write_tracker_data = _writer_of(database.write_tracker_data)
+read_tracker_data = _reader(database.read_tracker_data)
+write_log = _writer_of(database.write_log)
+flush_logs = _reader(database.flush_logs)
+read_logs = _reader(database.read_logs)
+read_logs_since = _reader(database.read_logs_since)
+compact_logs = _writer_of(database.compact_logs)
+read_log_summaries = _reader(database.read_log_summaries)
+write_job_stats = _writer_of(database.write_job_stats)
+read_job_stats = _reader(database.read_job_stats)
+get_all_stats_today = _reader(database.get_all_stats_today)
@@ -1,18 +1,39 @@
 import sqlite3
 import json
-from datetime import datetime
+from datetime import datetime, timezone
 from typing import List, Dict, Optional
 import threading
+import hashlib
+import math
+import os
+import re
+from log_buffer import LogBuffer
 
 DB_NAME = "jobs_tracker.db"
+BUSY_TIMEOUT_SECONDS = 30
+# Log rows older than this many days are rolled into daily summaries by compact_logs; 0 keeps them all
+LOG_RETENTION_DAYS = int(os.getenv("LOG_RETENTION_DAYS", "30"))
+# Number of locations kept in each day's job_stats row
+TOP_LOCATIONS = 10
+# Posting fields stored as columns, in the order read_jobs returns them
+POSTING_FIELDS = ("job_id", "title", "company", "location", "description", "posted_date", "salary_min",
+                  "salary_max", "employment_type", "apply_link", "latitude", "longitude")
+# Size of the grid cells postings are indexed and aggregated by for the map; 0.5 degrees is about 55 km
+MAP_CELL_DEGREES = 0.5
+EARTH_RADIUS_KM = 6371.0
 _local = threading.local()
 
 
 def get_connection():
     """Get thread-local database connection"""
     if not hasattr(_local, "conn"):
-        _local.conn = sqlite3.connect(DB_NAME, check_same_thread=False)
-        _local.conn.row_factory = sqlite3.Row
+        conn = sqlite3.connect(DB_NAME, timeout=BUSY_TIMEOUT_SECONDS, check_same_thread=False)
+        # WAL lets the reader threads carry on while the writer and log threads write
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_SECONDS * 1000}")
+        conn.row_factory = sqlite3.Row
+        _local.conn = conn
     return _local.conn
 
 
@@ -21,7 +42,7 @@ def init_database():
     conn = get_connection()
     cursor = conn.cursor()
     
-    # Jobs table
+    # Jobs table (one JSON array per category and day; superseded by postings)
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS jobs (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -33,6 +54,85 @@ def init_database():
         )
     """)
     
+    # One row per posting, however many days and categories it was seen in
+    _create_postings(cursor, "postings")
+    _add_posting_ids(cursor)
+    # Grid cells were added after the table; fill them in for postings stored before
+    for column in ("cell_lat", "cell_lon"):
+        _add_column(cursor, "postings", column, "INTEGER")
+    _backfill_cells(cursor)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_postings_location ON postings (location COLLATE NOCASE)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_postings_company ON postings (company COLLATE NOCASE)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_postings_employment_type ON postings (employment_type)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_postings_salary ON postings (salary_max)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_postings_last_seen ON postings (last_seen)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_postings_cell ON postings (cell_lat, cell_lon)")
+    
+    # Full-text index over postings, kept in step with it by triggers
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'postings_fts'")
+    fts_exists = cursor.fetchone() is not None
+    cursor.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS postings_fts USING fts5(
+            title, company, description,
+            content = 'postings', content_rowid = 'id', tokenize = 'porter unicode61'
+        )
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS postings_fts_insert AFTER INSERT ON postings BEGIN
+            INSERT INTO postings_fts (rowid, title, company, description)
+            VALUES (new.id, new.title, new.company, new.description);
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS postings_fts_delete AFTER DELETE ON postings BEGIN
+            INSERT INTO postings_fts (postings_fts, rowid, title, company, description)
+            VALUES ('delete', old.id, old.title, old.company, old.description);
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS postings_fts_update AFTER UPDATE OF title, company, description ON postings
+        WHEN old.title IS NOT new.title OR old.company IS NOT new.company OR old.description IS NOT new.description
+        BEGIN
+            INSERT INTO postings_fts (postings_fts, rowid, title, company, description)
+            VALUES ('delete', old.id, old.title, old.company, old.description);
+            INSERT INTO postings_fts (rowid, title, company, description)
+            VALUES (new.id, new.title, new.company, new.description);
+        END
+    """)
+    if not fts_exists:
+        cursor.execute("INSERT INTO postings_fts (postings_fts) VALUES ('rebuild')")
+    
+    # Which postings each category returned on each day
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS posting_categories (
+            category TEXT NOT NULL,
+            date TEXT NOT NULL,
+            job_id TEXT NOT NULL,
+            PRIMARY KEY (category, date, job_id)
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_posting_categories_job ON posting_categories (job_id)")
+    
+    # Postings seen each day per grid cell, across all categories, for the location map
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'job_map_tiles'")
+    tiles_exist = cursor.fetchone() is not None
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS job_map_tiles (
+            date TEXT NOT NULL,
+            cell_lat INTEGER NOT NULL,
+            cell_lon INTEGER NOT NULL,
+            location TEXT,
+            count INTEGER NOT NULL,
+            latitude_total REAL NOT NULL,
+            longitude_total REAL NOT NULL,
+            PRIMARY KEY (date, cell_lat, cell_lon)
+        )
+    """)
+    if not tiles_exist:
+        cursor.execute("SELECT DISTINCT date FROM posting_categories")
+        for (date,) in cursor.fetchall():
+            _rebuild_map_tiles(cursor, date)
+    
     # Tracker data table (stores state for each tracker)
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS trackers (
@@ -54,6 +154,21 @@ def init_database():
             timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         )
     """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_logs_tracker_timestamp ON logs (tracker_name, timestamp)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_logs_timestamp ON logs (timestamp)")
+    
+    # Daily per-tracker counts of compacted log entries
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS log_summaries (
+            tracker_name TEXT NOT NULL,
+            day TEXT NOT NULL,
+            log_type TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            first_timestamp TIMESTAMP,
+            last_timestamp TIMESTAMP,
+            PRIMARY KEY (tracker_name, day, log_type)
+        )
+    """)
     
     # Job statistics table
     cursor.execute("""
@@ -68,41 +183,461 @@ def init_database():
             UNIQUE(category, date)
         )
     """)
+    # Running salary aggregates, over each posting's salary_max, kept up to date at ingest
+    for column in ("salary_count", "salary_total", "salary_low", "salary_high"):
+        _add_column(cursor, "job_stats", column, "INTEGER")
+    
+    # Postings per location, per category and day
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS job_location_stats (
+            category TEXT NOT NULL,
+            date TEXT NOT NULL,
+            location TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (category, date, location)
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_job_location_stats_count ON job_location_stats (category, date, count)")
+    
+    # After the stats tables, since migrated days get stats too
+    _migrate_job_blobs(cursor)
     
     conn.commit()
 
 
+def _create_postings(cursor, table: str):
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {table} (
+            id INTEGER PRIMARY KEY,
+            job_id TEXT NOT NULL UNIQUE,
+            title TEXT,
+            company TEXT,
+            location TEXT,
+            description TEXT,
+            posted_date TEXT,
+            salary_min NUMERIC,
+            salary_max NUMERIC,
+            employment_type TEXT,
+            apply_link TEXT,
+            latitude REAL,
+            longitude REAL,
+            cell_lat INTEGER,
+            cell_lon INTEGER,
+            first_seen TEXT NOT NULL,
+            last_seen TEXT NOT NULL
+        )
+    """)
+
+
+def _add_posting_ids(cursor):
+    """Rebuild a postings table keyed by job_id alone with the integer id the full-text index uses"""
+    columns = [row[1] for row in cursor.execute("PRAGMA table_info(postings)")]
+    if "id" in columns:
+        return
+    _create_postings(cursor, "postings_rebuilt")
+    new_columns = {row[1] for row in cursor.execute("PRAGMA table_info(postings_rebuilt)")}
+    copied = ", ".join(column for column in columns if column in new_columns)
+    cursor.execute(f"INSERT INTO postings_rebuilt ({copied}) SELECT {copied} FROM postings")
+    cursor.execute("DROP TABLE postings")
+    cursor.execute("ALTER TABLE postings_rebuilt RENAME TO postings")
+
+
+def _add_column(cursor, table: str, column: str, definition: str):
+    """Add a column to an existing table unless it is already there"""
+    columns = [row[1] for row in cursor.execute(f"PRAGMA table_info({table})")]
+    if column not in columns:
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+
 # Jobs operations
-def write_jobs(category: str, date: str, jobs: List[Dict]):
-    """Store jobs data for a category and date"""
+def _backfill_cells(cursor):
+    cursor.execute("SELECT job_id, latitude, longitude FROM postings WHERE cell_lat IS NULL AND latitude IS NOT NULL")
+    cells = []
+    for job_id, latitude, longitude in cursor.fetchall():
+        coordinates = _coordinates({"latitude": latitude, "longitude": longitude})
+        if coordinates:
+            cells.append((*_cell(*coordinates), job_id))
+    cursor.executemany("UPDATE postings SET cell_lat = ?, cell_lon = ? WHERE job_id = ?", cells)
+
+
+def _migrate_job_blobs(cursor):
+    """Move days stored as JSON arrays in the jobs table into postings, with their stats and map tiles"""
+    cursor.execute("SELECT category, date, job_data FROM jobs ORDER BY date, id")
+    days = set()
+    for category, date, job_data in cursor.fetchall():
+        _upsert_postings(cursor, category, date, [{**job, "job_id": _posting_id(job)} for job in json.loads(job_data)])
+        days.add((category, date))
+    # Replaces any stats the old code wrote for these days, which lack the salary aggregates
+    for category, date in days:
+        _rebuild_stats(cursor, category, date)
+    for date in {date for _, date in days}:
+        _rebuild_map_tiles(cursor, date)
+    cursor.execute("DELETE FROM jobs")
+
+
+def _posting_id(job: Dict) -> str:
+    """The posting's job_id, or a stable hash of what identifies it when the API gave none"""
+    if job.get("job_id"):
+        return str(job["job_id"])
+    key = "|".join(str(job.get(field) or "") for field in ("apply_link", "title", "company", "location"))
+    return "hash_" + hashlib.sha1(key.encode()).hexdigest()
+
+
+def _coordinates(job: Dict) -> Optional[tuple]:
+    try:
+        latitude, longitude = float(job["latitude"]), float(job["longitude"])
+    except (KeyError, TypeError, ValueError):
+        return None
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180) or (latitude == 0 and longitude == 0):
+        return None
+    return latitude, longitude
+
+
+def _cell(latitude: float, longitude: float) -> tuple:
+    return math.floor(latitude / MAP_CELL_DEGREES), math.floor(longitude / MAP_CELL_DEGREES)
+
+
+def _upsert_postings(cursor, category: str, date: str, jobs: List[Dict]):
+    rows, tiles = [], []
+    for job in jobs:
+        coordinates = _coordinates(job)
+        cell = _cell(*coordinates) if coordinates else (None, None)
+        rows.append((*(job.get(field) for field in POSTING_FIELDS), *cell, date, date))
+        if coordinates:
+            tiles.append((date, *cell, job.get("location"), *coordinates, job["job_id"], date))
+    cursor.executemany(f"""
+        INSERT INTO postings ({", ".join(POSTING_FIELDS)}, cell_lat, cell_lon, first_seen, last_seen)
+        VALUES ({", ".join("?" * len(POSTING_FIELDS))}, ?, ?, ?, ?)
+        ON CONFLICT(job_id) DO UPDATE SET
+            {", ".join(f"{field} = excluded.{field}" for field in POSTING_FIELDS[1:])},
+            cell_lat = excluded.cell_lat,
+            cell_lon = excluded.cell_lon,
+            first_seen = MIN(first_seen, excluded.first_seen),
+            last_seen = MAX(last_seen, excluded.last_seen)
+    """, rows)
+    # Count each posting in the map once per day, whichever categories it appears in
+    cursor.executemany("""
+        INSERT INTO job_map_tiles (date, cell_lat, cell_lon, location, count, latitude_total, longitude_total)
+        SELECT ?, ?, ?, ?, 1, ?, ?
+        WHERE NOT EXISTS (SELECT 1 FROM posting_categories WHERE job_id = ? AND date = ?)
+        ON CONFLICT(date, cell_lat, cell_lon) DO UPDATE SET
+            count = count + 1,
+            latitude_total = latitude_total + excluded.latitude_total,
+            longitude_total = longitude_total + excluded.longitude_total,
+            location = COALESCE(location, excluded.location)
+    """, tiles)
+    cursor.executemany("""
+        INSERT OR IGNORE INTO posting_categories (category, date, job_id)
+        VALUES (?, ?, ?)
+    """, [(category, date, job["job_id"]) for job in jobs])
+
+
+def _rebuild_map_tiles(cursor, date: str):
+    cursor.execute("DELETE FROM job_map_tiles WHERE date = ?", (date,))
+    cursor.execute("""
+        INSERT INTO job_map_tiles (date, cell_lat, cell_lon, location, count, latitude_total, longitude_total)
+        SELECT ?, cell_lat, cell_lon, MIN(location), COUNT(*), SUM(latitude), SUM(longitude)
+        FROM postings
+        WHERE cell_lat IS NOT NULL AND job_id IN (SELECT job_id FROM posting_categories WHERE date = ?)
+        GROUP BY cell_lat, cell_lon
+    """, (date, date))
+
+
+def ingest_jobs(category: str, date: str, jobs: List[Dict]) -> int:
+    """
+    Upsert a batch of postings and add them to a category's day. Postings the day already had
+    are refreshed but not counted again; new ones are folded into that day's stats. Returns the
+    number of new postings.
+    """
     conn = get_connection()
     cursor = conn.cursor()
     
-    job_data = json.dumps(jobs)
+    try:
+        cursor.execute("SELECT job_id FROM posting_categories WHERE category = ? AND date = ?", (category, date))
+        seen = {row[0] for row in cursor.fetchall()}
+        batch = {}
+        for job in jobs:
+            job_id = _posting_id(job)
+            batch[job_id] = {**job, "job_id": job_id}
+        new_jobs = [job for job_id, job in batch.items() if job_id not in seen]
+        _upsert_postings(cursor, category, date, list(batch.values()))
+        if new_jobs:
+            _add_to_stats(cursor, category, date, new_jobs)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    
+    return len(new_jobs)
+
+
+def _add_to_stats(cursor, category: str, date: str, jobs: List[Dict]):
+    salaries = [job["salary_max"] for job in jobs if job.get("salary_max")]
+    locations = {}
+    for job in jobs:
+        location = job.get("location", "Unknown")
+        locations[location] = locations.get(location, 0) + 1
+    
+    cursor.executemany("""
+        INSERT INTO job_location_stats (category, date, location, count)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT(category, date, location) DO UPDATE SET count = count + excluded.count
+    """, [(category, date, location, count) for location, count in locations.items()])
     cursor.execute("""
-        INSERT OR REPLACE INTO jobs (category, date, job_data)
-        VALUES (?, ?, ?)
-    """, (category, date, job_data))
+        SELECT location AS name, count FROM job_location_stats
+        WHERE category = ? AND date = ?
+        ORDER BY count DESC, location
+        LIMIT ?
+    """, (category, date, TOP_LOCATIONS))
+    top_locations = [dict(row) for row in cursor.fetchall()]
     
-    conn.commit()
+    cursor.execute("""
+        INSERT INTO job_stats (category, date, total_jobs, avg_salary, locations,
+                               salary_count, salary_total, salary_low, salary_high)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(category, date) DO UPDATE SET
+            total_jobs = total_jobs + excluded.total_jobs,
+            salary_count = COALESCE(salary_count, 0) + excluded.salary_count,
+            salary_total = COALESCE(salary_total, 0) + excluded.salary_total,
+            salary_low = MIN(COALESCE(salary_low, excluded.salary_low), COALESCE(excluded.salary_low, salary_low)),
+            salary_high = MAX(COALESCE(salary_high, excluded.salary_high), COALESCE(excluded.salary_high, salary_high)),
+            locations = excluded.locations,
+            timestamp = CURRENT_TIMESTAMP
+    """, (category, date, len(jobs), 0, json.dumps(top_locations), len(salaries), sum(salaries),
+          min(salaries) if salaries else None, max(salaries) if salaries else None))
+    cursor.execute("""
+        UPDATE job_stats SET avg_salary = COALESCE(CAST(salary_total / NULLIF(salary_count, 0) AS INTEGER), 0)
+        WHERE category = ? AND date = ?
+    """, (category, date))
 
 
-def read_jobs(category: str, date: str) -> Optional[List[Dict]]:
-    """Read jobs data for a category and date"""
+def rebuild_job_stats(category: str, date: str):
+    """Recompute a day's stats from its stored postings, e.g. for days ingested before stats were kept"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    try:
+        _rebuild_stats(cursor, category, date)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def _rebuild_stats(cursor, category: str, date: str):
+    cursor.execute("DELETE FROM job_stats WHERE category = ? AND date = ?", (category, date))
+    cursor.execute("DELETE FROM job_location_stats WHERE category = ? AND date = ?", (category, date))
+    jobs = read_jobs(category, date)
+    if jobs:
+        _add_to_stats(cursor, category, date, jobs)
+
+
+def read_category_stats(category: str, date: str) -> Optional[Dict]:
+    """Read one day's stats for a category, or None if nothing has been ingested for it"""
     conn = get_connection()
     cursor = conn.cursor()
     
     cursor.execute("""
-        SELECT job_data FROM jobs
+        SELECT category, total_jobs, avg_salary, locations, salary_count, salary_low, salary_high
+        FROM job_stats
         WHERE category = ? AND date = ?
     """, (category, date))
     
     row = cursor.fetchone()
-    if row:
-        return json.loads(row[0])
+    if row is None:
+        return None
+    stats = dict(row)
+    stats["locations"] = json.loads(stats["locations"]) if stats["locations"] else []
+    return stats
+
+
+def read_jobs(category: str, date: str) -> Optional[List[Dict]]:
+    """Read jobs data for a category and date"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    cursor.execute(f"""
+        SELECT {", ".join(f"p.{field}" for field in POSTING_FIELDS)}
+        FROM posting_categories c JOIN postings p ON p.job_id = c.job_id
+        WHERE c.category = ? AND c.date = ?
+        ORDER BY c.rowid
+    """, (category, date))
+    
+    rows = cursor.fetchall()
+    if rows:
+        return [dict(row) for row in rows]
     return None
 
 
+def _posting_filters(category: Optional[str] = None, date: Optional[str] = None, location: Optional[str] = None,
+                     company: Optional[str] = None, employment_type: Optional[str] = None,
+                     min_salary: Optional[float] = None, max_salary: Optional[float] = None,
+                     table: str = "postings") -> tuple:
+    """SQL conditions and parameters for search_postings' filters, on columns of table"""
+    conditions, params = [], []
+    if category:
+        conditions.append(f"{table}.job_id IN (SELECT job_id FROM posting_categories WHERE category = ?"
+                          + (" AND date = ?)" if date else ")"))
+        params += [category, date] if date else [category]
+    elif date:
+        conditions.append(f"{table}.last_seen >= ?")
+        params.append(date)
+    for column, value in (("location", location), ("company", company)):
+        if value:
+            conditions.append(f"{table}.{column} = ? COLLATE NOCASE")
+            params.append(value)
+    if employment_type:
+        conditions.append(f"{table}.employment_type = ?")
+        params.append(employment_type)
+    if min_salary is not None:
+        conditions.append(f"{table}.salary_max >= ?")
+        params.append(min_salary)
+    if max_salary is not None:
+        conditions.append(f"{table}.salary_max <= ?")
+        params.append(max_salary)
+    return conditions, params
+
+
+def search_postings(category: Optional[str] = None, date: Optional[str] = None, location: Optional[str] = None,
+                    company: Optional[str] = None, employment_type: Optional[str] = None,
+                    min_salary: Optional[float] = None, max_salary: Optional[float] = None,
+                    limit: Optional[int] = 100) -> List[Dict]:
+    """
+    Find postings matching every filter given. Location and company match whole values, ignoring
+    case; salaries are compared with salary_max. Without a category, date matches postings seen
+    on or after it. A limit of None returns every match.
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    conditions, params = _posting_filters(category, date, location, company, employment_type, min_salary, max_salary)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    cursor.execute(f"""
+        SELECT {", ".join(POSTING_FIELDS)}, first_seen, last_seen
+        FROM postings
+        {where}
+        ORDER BY last_seen DESC, salary_max DESC
+        LIMIT ?
+    """, (*params, -1 if limit is None else limit))
+    
+    return [dict(row) for row in cursor.fetchall()]
+
+
+def search_postings_text(query: str, limit: int = 20, **filters) -> List[Dict]:
+    """
+    Full-text search over posting titles, companies and descriptions, best matches first. Each
+    result has a bm25 score (lower is better) and a snippet with the matched terms in [brackets].
+    query uses FTS5 syntax (e.g. "snowflake OR dbt", "remote health*"); if it does not parse, its
+    words are searched for as plain terms. filters are as for search_postings.
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    conditions, params = _posting_filters(**filters, table="p")
+    where = "".join(f" AND {condition}" for condition in conditions)
+    sql = f"""
+        SELECT {", ".join(f"p.{field}" for field in POSTING_FIELDS)}, p.first_seen, p.last_seen,
+               bm25(postings_fts, 10.0, 5.0, 1.0) AS score,
+               snippet(postings_fts, -1, '[', ']', '…', 16) AS snippet
+        FROM postings_fts JOIN postings p ON p.id = postings_fts.rowid
+        WHERE postings_fts MATCH ?{where}
+        ORDER BY score
+        LIMIT ?
+    """
+    
+    try:
+        cursor.execute(sql, (query, *params, limit))
+    except sqlite3.OperationalError:
+        terms = " ".join('"' + word + '"' for word in re.findall(r"\w+", query))
+        if not terms:
+            return []
+        cursor.execute(sql, (terms, *params, limit))
+    
+    return [dict(row) for row in cursor.fetchall()]
+
+
+def read_posting(job_id: str) -> Optional[Dict]:
+    """Read one posting, with the categories it was listed under"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    cursor.execute(f"""
+        SELECT {", ".join(POSTING_FIELDS)}, first_seen, last_seen
+        FROM postings
+        WHERE job_id = ?
+    """, (job_id,))
+    row = cursor.fetchone()
+    if row is None:
+        return None
+    
+    posting = dict(row)
+    cursor.execute("SELECT DISTINCT category FROM posting_categories WHERE job_id = ? ORDER BY category", (job_id,))
+    posting["categories"] = [row[0] for row in cursor.fetchall()]
+    return posting
+
+
+def search_postings_near(latitude: float, longitude: float, radius_km: float, category: Optional[str] = None,
+                         date: Optional[str] = None, limit: int = 50) -> List[Dict]:
+    """
+    Find postings within radius_km of a point, nearest first, with their distance_km. The grid
+    index narrows the search to the cells around the point; category and date filter as in
+    search_postings.
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    # Bounding box of the circle, widened in longitude away from the equator
+    lat_delta = math.degrees(radius_km / EARTH_RADIUS_KM)
+    lon_delta = lat_delta / max(math.cos(math.radians(min(abs(latitude) + lat_delta, 89.9))), 1e-6)
+    low_cell, high_cell = _cell(latitude - lat_delta, longitude - lon_delta), _cell(latitude + lat_delta, longitude + lon_delta)
+    
+    conditions = ["cell_lat BETWEEN ? AND ?", "cell_lon BETWEEN ? AND ?",
+                  "latitude BETWEEN ? AND ?", "longitude BETWEEN ? AND ?"]
+    params = [low_cell[0], high_cell[0], low_cell[1], high_cell[1],
+              latitude - lat_delta, latitude + lat_delta, longitude - lon_delta, longitude + lon_delta]
+    filters, filter_params = _posting_filters(category, date)
+    conditions += filters
+    params += filter_params
+    
+    cursor.execute(f"""
+        SELECT {", ".join(POSTING_FIELDS)}, first_seen, last_seen
+        FROM postings
+        WHERE {" AND ".join(conditions)}
+    """, params)
+    
+    nearby = []
+    for row in cursor.fetchall():
+        posting = dict(row)
+        distance = _distance_km(latitude, longitude, posting["latitude"], posting["longitude"])
+        if distance <= radius_km:
+            posting["distance_km"] = round(distance, 1)
+            nearby.append(posting)
+    nearby.sort(key=lambda posting: posting["distance_km"])
+    return nearby[:limit]
+
+
+def _distance_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance by the haversine formula"""
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def read_map_tiles(date: str) -> List[Dict]:
+    """Read the day's postings per grid cell, each placed at the average position of its postings"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    cursor.execute("""
+        SELECT location, count, latitude_total / count AS lat, longitude_total / count AS lon
+        FROM job_map_tiles
+        WHERE date = ?
+        ORDER BY count DESC
+    """, (date,))
+    
+    return [dict(row) for row in cursor.fetchall()]
+
+
 # Tracker operations
 def write_tracker_data(name: str, category: str, total_tracked: int, data: Dict):
     """Update tracker state"""
@@ -139,41 +674,124 @@ def read_tracker_data(name: str) -> Optional[Dict]:
 
 
 # Logging operations
-def write_log(tracker_name: str, log_type: str, message: str):
-    """Write a log entry"""
+def _insert_logs(rows: List[tuple]):
     conn = get_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute("""
-        INSERT INTO logs (tracker_name, log_type, message)
-        VALUES (?, ?, ?)
-    """, (tracker_name, log_type, message))
-    
+    conn.executemany("""
+        INSERT INTO logs (tracker_name, log_type, message, timestamp)
+        VALUES (?, ?, ?, ?)
+    """, rows)
     conn.commit()
 
 
+log_buffer = LogBuffer(_insert_logs)
+
+
+def write_log(tracker_name: str, log_type: str, message: str):
+    """Queue a log entry; entries are written in batches on a background thread"""
+    # Same format as CURRENT_TIMESTAMP, taken now rather than when the batch is written
+    timestamp = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+    log_buffer.put((tracker_name, log_type, message, timestamp))
+
+
+def flush_logs():
+    """Wait until every queued log entry has been written"""
+    log_buffer.flush()
+
+
 def read_logs(tracker_name: Optional[str] = None, limit: int = 100) -> List[Dict]:
     """Read log entries"""
+    flush_logs()
     conn = get_connection()
     cursor = conn.cursor()
     
     if tracker_name:
         cursor.execute("""
-            SELECT tracker_name, log_type, message, timestamp FROM logs
+            SELECT id, tracker_name, log_type, message, timestamp FROM logs
             WHERE tracker_name = ?
-            ORDER BY timestamp DESC
+            ORDER BY timestamp DESC, id DESC
             LIMIT ?
         """, (tracker_name, limit))
     else:
         cursor.execute("""
-            SELECT tracker_name, log_type, message, timestamp FROM logs
-            ORDER BY timestamp DESC
+            SELECT id, tracker_name, log_type, message, timestamp FROM logs
+            ORDER BY timestamp DESC, id DESC
             LIMIT ?
         """, (limit,))
     
     return [dict(row) for row in cursor.fetchall()]
 
 
+def read_logs_since(since_id: int = 0, tracker_name: Optional[str] = None, limit: int = 100) -> List[Dict]:
+    """Read log entries written after the entry with since_id, oldest first; pass the last id back for the next page"""
+    flush_logs()
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    if tracker_name:
+        cursor.execute("""
+            SELECT id, tracker_name, log_type, message, timestamp FROM logs
+            WHERE tracker_name = ? AND id > ?
+            ORDER BY id
+            LIMIT ?
+        """, (tracker_name, since_id, limit))
+    else:
+        cursor.execute("""
+            SELECT id, tracker_name, log_type, message, timestamp FROM logs
+            WHERE id > ?
+            ORDER BY id
+            LIMIT ?
+        """, (since_id, limit))
+    
+    return [dict(row) for row in cursor.fetchall()]
+
+
+def compact_logs(retention_days: int = LOG_RETENTION_DAYS) -> int:
+    """Roll log entries older than retention_days into daily per-tracker summaries and delete them"""
+    if retention_days <= 0:
+        return 0
+    flush_logs()
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    cutoff = cursor.execute("SELECT date('now', ?)", (f"-{retention_days} days",)).fetchone()[0]
+    try:
+        cursor.execute("""
+            INSERT INTO log_summaries (tracker_name, day, log_type, count, first_timestamp, last_timestamp)
+            SELECT tracker_name, date(timestamp), log_type, COUNT(*), MIN(timestamp), MAX(timestamp)
+            FROM logs WHERE timestamp < ?
+            GROUP BY tracker_name, date(timestamp), log_type
+            ON CONFLICT(tracker_name, day, log_type) DO UPDATE SET
+                count = count + excluded.count,
+                first_timestamp = MIN(first_timestamp, excluded.first_timestamp),
+                last_timestamp = MAX(last_timestamp, excluded.last_timestamp)
+        """, (cutoff,))
+        cursor.execute("DELETE FROM logs WHERE timestamp < ?", (cutoff,))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    
+    return cursor.rowcount
+
+
+def read_log_summaries(tracker_name: Optional[str] = None, days: int = 90) -> List[Dict]:
+    """Read daily log summaries for the past N days"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    query = """
+        SELECT tracker_name, day, log_type, count FROM log_summaries
+        WHERE day >= date('now', ?)
+    """
+    params = [f"-{days} days"]
+    if tracker_name:
+        query += " AND tracker_name = ?"
+        params.append(tracker_name)
+    cursor.execute(query + " ORDER BY day, tracker_name, log_type", params)
+    
+    return [dict(row) for row in cursor.fetchall()]
+
+
 # Statistics operations
 def write_job_stats(category: str, date: str, total_jobs: int, avg_salary: int, locations: List[Dict]):
     """Store job statistics"""
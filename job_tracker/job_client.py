@@ -1,4 +1,4 @@
-from database import read_tracker_data
+from async_database import read_tracker_data
 import json
 
 
@@ -6,7 +6,7 @@ async def read_tracker_resource(name: str) -> str:
     """
     Read tracker data as a resource for the agent
     """
-    tracker = read_tracker_data(name)
+    tracker = await read_tracker_data(name)
     
     if not tracker:
         return json.dumps({
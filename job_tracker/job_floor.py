@@ -3,6 +3,8 @@ from typing import List
 import asyncio
 from tracers import LogTracer
 from agents import add_trace_processor
+from async_database import compact_logs
+from jobs_api import fetch_jobs, RAPIDAPI_KEY
 from dotenv import load_dotenv
 import os
 
@@ -36,7 +38,15 @@ async def run_every_n_minutes():
     
     while True:
         print(f"🔄 Starting new tracking cycle...")
+        if RAPIDAPI_KEY:
+            # Fetch every category's pages up front, so the trackers' tools read from storage
+            fetched = await fetch_jobs(categories.keys())
+            print(f"📥 Fetched new jobs: {fetched}")
         await asyncio.gather(*[tracker.run() for tracker in trackers])
+        try:
+            await compact_logs()
+        except Exception as e:
+            print(f"Could not compact logs: {e}")
         print(f"✅ Tracking cycle completed. Sleeping for {RUN_EVERY_N_MINUTES} minutes...\n")
         await asyncio.sleep(RUN_EVERY_N_MINUTES * 60)
 
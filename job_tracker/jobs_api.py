@@ -1,20 +1,154 @@
 import os
-import requests
+import asyncio
+import random
+import httpx
 from dotenv import load_dotenv
 from datetime import datetime, timedelta
-from database import write_jobs, read_jobs
-from typing import List, Dict
+from database import read_jobs, ingest_jobs, read_category_stats
+import async_database
+from typing import List, Dict, Optional, Iterable
 import time
 
 load_dotenv(override=True)
 
 RAPIDAPI_KEY = os.getenv("RAPIDAPI_KEY")
 RAPIDAPI_HOST = "jsearch.p.rapidapi.com"
+# Point at a local fake JSearch server (e.g. http://127.0.0.1:8000) to exercise the fetcher offline
+RAPIDAPI_BASE_URL = os.getenv("RAPIDAPI_BASE_URL", f"https://{RAPIDAPI_HOST}")
+# Result pages requested per category and location; JSearch returns up to 10 postings a page
+FETCH_PAGES = int(os.getenv("JOBS_FETCH_PAGES", "3"))
+# Requests in flight at once, across every category, location and page
+FETCH_CONCURRENCY = int(os.getenv("JOBS_FETCH_CONCURRENCY", "4"))
+FETCH_LOCATIONS = [location.strip() for location in os.getenv("JOBS_FETCH_LOCATIONS", "United States").split(",")]
+FETCH_RETRIES = 3
+FETCH_BACKOFF_SECONDS = 1.0
+FETCH_TIMEOUT_SECONDS = 10
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+_client: Optional[httpx.AsyncClient] = None
+_client_loop = None
+
+
+def new_http_client(base_url: str = RAPIDAPI_BASE_URL) -> httpx.AsyncClient:
+    """A pooled JSearch client, sized for FETCH_CONCURRENCY requests at once"""
+    return httpx.AsyncClient(
+        base_url=base_url,
+        headers={"X-RapidAPI-Key": RAPIDAPI_KEY or "", "X-RapidAPI-Host": RAPIDAPI_HOST},
+        timeout=FETCH_TIMEOUT_SECONDS,
+        limits=httpx.Limits(max_connections=FETCH_CONCURRENCY, max_keepalive_connections=FETCH_CONCURRENCY),
+    )
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the shared client for the running event loop, creating it on first use"""
+    global _client, _client_loop
+    loop = asyncio.get_running_loop()
+    if _client is None or _client.is_closed or _client_loop is not loop:
+        _client = new_http_client()
+        _client_loop = loop
+    return _client
+
+
+def normalize_job(job: Dict) -> Dict:
+    """Turn a JSearch result into the posting fields we store"""
+    return {
+        "job_id": job.get("job_id"),
+        "title": job.get("job_title"),
+        "company": job.get("employer_name"),
+        "location": (job.get("job_city") or "") + ", " + (job.get("job_state") or ""),
+        "description": (job.get("job_description") or "")[:500],  # Truncate
+        "posted_date": job.get("job_posted_at_datetime_utc"),
+        "salary_min": job.get("job_min_salary"),
+        "salary_max": job.get("job_max_salary"),
+        "employment_type": job.get("job_employment_type"),
+        "apply_link": job.get("job_apply_link"),
+        "latitude": job.get("job_latitude"),
+        "longitude": job.get("job_longitude"),
+    }
+
+
+async def fetch_page(client: httpx.AsyncClient, query: str, location: str = "United States", page: int = 1,
+                     date_posted: str = "today") -> List[Dict]:
+    """
+    Fetch one page of JSearch results, retrying connection errors, rate limits and server
+    errors with jittered exponential backoff. Returns [] if the page could not be fetched.
+    """
+    params = {
+        "query": f"{query} in {location}",
+        "page": str(page),
+        "num_pages": "1",
+        "date_posted": date_posted
+    }
+    
+    for attempt in range(FETCH_RETRIES + 1):
+        delay = random.uniform(0, FETCH_BACKOFF_SECONDS * 2 ** attempt)
+        try:
+            response = await client.get("/search", params=params)
+            if response.status_code in RETRY_STATUSES and attempt < FETCH_RETRIES:
+                retry_after = response.headers.get("Retry-After", "")
+                await asyncio.sleep(float(retry_after) if retry_after.isdigit() else delay)
+                continue
+            response.raise_for_status()
+            return [normalize_job(job) for job in response.json().get("data") or []]
+        except httpx.TransportError as e:
+            if attempt == FETCH_RETRIES:
+                print(f"Error fetching {query} in {location}, page {page}: {e}")
+                return []
+            await asyncio.sleep(delay)
+        except (httpx.HTTPStatusError, ValueError) as e:
+            print(f"Error fetching {query} in {location}, page {page}: {e}")
+            return []
+    return []
+
+
+async def fetch_jobs(categories: Iterable[str], locations: Optional[List[str]] = None, pages: int = FETCH_PAGES,
+                     date_posted: str = "today", client: Optional[httpx.AsyncClient] = None, store=None) -> Dict[str, int]:
+    """
+    Fetch every page for each category and location concurrently, at most FETCH_CONCURRENCY
+    requests at a time, and store each page's postings under today's date as soon as it arrives.
+    store(category, date, jobs) is awaited for each page (async_database.ingest_jobs by default).
+    Returns the number of new postings per category.
+    """
+    categories = list(categories)
+    today = datetime.now().date().strftime("%Y-%m-%d")
+    client = client or get_http_client()
+    store = store or async_database.ingest_jobs
+    slots = asyncio.Semaphore(FETCH_CONCURRENCY)
+    
+    async def fetch(category: str, location: str, page: int):
+        async with slots:
+            return category, await fetch_page(client, category, location, page, date_posted)
+    
+    tasks = [
+        asyncio.create_task(fetch(category, location, page))
+        for category in categories
+        for location in locations or FETCH_LOCATIONS
+        for page in range(1, pages + 1)
+    ]
+    new_jobs = {category: 0 for category in categories}
+    try:
+        for finished in asyncio.as_completed(tasks):
+            category, jobs = await finished
+            if jobs:
+                new_jobs[category] += await store(category, today, jobs)
+    finally:
+        for task in tasks:
+            task.cancel()
+    return new_jobs
+
+
+def _require_no_event_loop(instead: str):
+    """asyncio.run can't be nested, so the sync entry points refuse to run inside an event loop"""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    raise RuntimeError(f"Called from a running event loop; await {instead} instead")
 
 
 def get_jobs_from_rapidapi(query: str, location: str = "United States", date_posted: str = "today") -> List[Dict]:
     """
-    Fetch jobs from JSearch API on RapidAPI
+    Fetch jobs from JSearch API on RapidAPI. Not for use inside an event loop: await fetch_page there
     
     Args:
         query: Job title/category (e.g., "Business Analyst", "Data Analyst")
@@ -22,49 +156,17 @@ def get_jobs_from_rapidapi(query: str, location: str = "United States", date_pos
         date_posted: Options: "all", "today", "3days", "week", "month"
     
     Returns:
-        List of job dictionaries
+        List of job dictionaries, from the first FETCH_PAGES pages
     """
-    url = "https://jsearch.p.rapidapi.com/search"
-    
-    headers = {
-        "X-RapidAPI-Key": RAPIDAPI_KEY,
-        "X-RapidAPI-Host": RAPIDAPI_HOST
-    }
-    
-    querystring = {
-        "query": f"{query} in {location}",
-        "page": "1",
-        "num_pages": "1",
-        "date_posted": date_posted
-    }
+    async def fetch_all():
+        async with new_http_client() as client:
+            pages = await asyncio.gather(*[
+                fetch_page(client, query, location, page, date_posted) for page in range(1, FETCH_PAGES + 1)
+            ])
+        return [job for page in pages for job in page]
     
-    try:
-        response = requests.get(url, headers=headers, params=querystring, timeout=10)
-        response.raise_for_status()
-        data = response.json()
-        
-        jobs = []
-        for job in data.get("data", []):
-            jobs.append({
-                "job_id": job.get("job_id"),
-                "title": job.get("job_title"),
-                "company": job.get("employer_name"),
-                "location": job.get("job_city", "") + ", " + job.get("job_state", ""),
-                "description": job.get("job_description", "")[:500],  # Truncate
-                "posted_date": job.get("job_posted_at_datetime_utc"),
-                "salary_min": job.get("job_min_salary"),
-                "salary_max": job.get("job_max_salary"),
-                "employment_type": job.get("job_employment_type"),
-                "apply_link": job.get("job_apply_link"),
-                "latitude": job.get("job_latitude"),
-                "longitude": job.get("job_longitude"),
-            })
-        
-        return jobs
-        
-    except requests.exceptions.RequestException as e:
-        print(f"Error fetching jobs from RapidAPI: {e}")
-        return []
+    _require_no_event_loop("fetch_page")
+    return asyncio.run(fetch_all())
 
 
 def get_jobs_mock(query: str, location: str = "United States") -> List[Dict]:
@@ -112,50 +214,114 @@ def get_jobs_mock(query: str, location: str = "United States") -> List[Dict]:
 
 def get_todays_jobs(category: str, use_mock: bool = False) -> List[Dict]:
     """
-    Get today's jobs for a specific category
+    Get today's jobs for a specific category. Not for use inside an event loop: await fetch_todays_jobs there
     """
+    _require_no_event_loop("fetch_todays_jobs")
     today = datetime.now().date().strftime("%Y-%m-%d")
     
     # Try to read from cache first
     cached_jobs = read_jobs(category, today)
     if cached_jobs:
         print(f"✓ Using cached jobs for {category} from {today}")
-        # Still write stats even for cached data
-        stats = get_job_stats(category)
-        from database import write_job_stats
-        write_job_stats(category, today, stats['total_jobs'], stats['avg_salary'], stats['locations'])
         return cached_jobs
     
     # Fetch new jobs
     print(f"→ Fetching new jobs for {category}...")
     
+    # Cache the results; stats for the dashboard are updated as they are stored
     if use_mock or not RAPIDAPI_KEY:
         jobs = get_jobs_mock(category)
         print(f"  Using MOCK data: {len(jobs)} jobs")
+        if jobs:
+            ingest_jobs(category, today, jobs)
     else:
-        jobs = get_jobs_from_rapidapi(category, date_posted="today")
-        print(f"  From RapidAPI: {len(jobs)} jobs")
+        fetched = asyncio.run(_fetch_here([category]))
+        print(f"  From RapidAPI: {fetched[category]} jobs")
     
-    # Cache the results
+    jobs = read_jobs(category, today) or []
     if jobs:
-        write_jobs(category, today, jobs)
-        
-        # IMPORTANT: Write stats to database for dashboard
-        stats = get_job_stats(category)
-        from database import write_job_stats
-        write_job_stats(category, today, stats['total_jobs'], stats['avg_salary'], stats['locations'])
+        stats = read_category_stats(category, today)
         print(f"  ✅ Saved stats: {stats['total_jobs']} jobs, avg ${stats['avg_salary']:,}")
     
     return jobs
 
 
-def get_job_stats(category: str) -> Dict:
+async def _fetch_here(categories: List[str]) -> Dict[str, int]:
+    """fetch_jobs on a client of its own, storing pages on the calling thread, for use under asyncio.run"""
+    async def store(category: str, date: str, jobs: List[Dict]) -> int:
+        return ingest_jobs(category, date, jobs)
+    
+    async with new_http_client() as client:
+        return await fetch_jobs(categories, client=client, store=store)
+
+
+async def fetch_todays_jobs(category: str, use_mock: bool = False) -> List[Dict]:
+    """
+    Async get_todays_jobs: fetch and store today's jobs for a category without blocking the
+    event loop, unless they are already stored
+    """
+    today = datetime.now().date().strftime("%Y-%m-%d")
+    
+    cached_jobs = await async_database.read_jobs(category, today)
+    if cached_jobs:
+        return cached_jobs
+    
+    if use_mock or not RAPIDAPI_KEY:
+        await async_database.ingest_jobs(category, today, get_jobs_mock(category))
+    else:
+        await fetch_jobs([category])
+    
+    return await async_database.read_jobs(category, today) or []
+
+
+async def _fetch_if_missing(category: str, today: str, use_mock: bool):
+    if await async_database.read_category_stats(category, today) is None:
+        await fetch_todays_jobs(category, use_mock=use_mock)
+
+
+async def find_jobs(category: str, use_mock: bool = False, limit: Optional[int] = None, **filters) -> List[Dict]:
+    """
+    Find today's jobs in a category matching filters (see database.search_postings), all of
+    them unless a limit is given, fetching the category first if it has not been fetched today
+    """
+    today = datetime.now().date().strftime("%Y-%m-%d")
+    
+    await _fetch_if_missing(category, today, use_mock)
+    
+    return await async_database.search_postings(category=category, date=today, limit=limit, **filters)
+
+
+async def find_jobs_near(lat: float, lon: float, radius_km: float, category: Optional[str] = None,
+                         use_mock: bool = False, limit: int = 50) -> List[Dict]:
+    """
+    Find today's jobs within radius_km of a point, nearest first. With a category, fetch it first
+    if it has not been fetched today; without one, search every category seen today
+    """
+    today = datetime.now().date().strftime("%Y-%m-%d")
+    
+    if category:
+        await _fetch_if_missing(category, today, use_mock)
+    
+    return await async_database.search_postings_near(lat, lon, radius_km, category=category, date=today, limit=limit)
+
+
+async def get_job_stats(category: str, use_mock: bool = False) -> Dict:
     """
     Get statistics for a job category
     """
-    jobs = get_todays_jobs(category)
+    today = datetime.now().date().strftime("%Y-%m-%d")
+    
+    stats = await async_database.read_category_stats(category, today)
+    if stats is None:
+        # Nothing ingested today yet, so fetch first
+        await fetch_todays_jobs(category, use_mock=use_mock)
+        stats = await async_database.read_category_stats(category, today)
+    elif stats["salary_count"] is None:
+        # Written before salary aggregates were kept
+        await async_database.rebuild_job_stats(category, today)
+        stats = await async_database.read_category_stats(category, today)
     
-    if not jobs:
+    if stats is None:
         return {
             "category": category,
             "total_jobs": 0,
@@ -163,17 +329,29 @@ def get_job_stats(category: str) -> Dict:
             "locations": []
         }
     
-    salaries = [j["salary_max"] for j in jobs if j.get("salary_max")]
-    locations = {}
+    return {
+        "category": category,
+        "total_jobs": stats["total_jobs"],
+        "avg_salary": stats["avg_salary"],
+        "locations": stats["locations"]
+    }
+
+
+async def get_salary_range(category: str, use_mock: bool = False) -> Dict:
+    """
+    Get the salary range for a job category, from today's stats
+    """
+    today = datetime.now().date().strftime("%Y-%m-%d")
     
-    for job in jobs:
-        loc = job.get("location", "Unknown")
-        locations[loc] = locations.get(loc, 0) + 1
+    await get_job_stats(category, use_mock=use_mock)
+    stats = await async_database.read_category_stats(category, today)
+    
+    if not stats or not stats["salary_count"]:
+        return {"min": 0, "max": 0, "avg": 0, "count": 0}
     
     return {
-        "category": category,
-        "total_jobs": len(jobs),
-        "avg_salary": sum(salaries) // len(salaries) if salaries else 0,
-        "locations": [{"name": k, "count": v} for k, v in sorted(locations.items(), key=lambda x: x[1], reverse=True)][:10],
-        "jobs": jobs
+        "min": stats["salary_low"],
+        "max": stats["salary_high"],
+        "avg": stats["avg_salary"],
+        "count": stats["salary_count"]
     }
\ No newline at end of file
@@ -1,6 +1,7 @@
 from mcp.server.fastmcp import FastMCP
-from jobs_api import get_todays_jobs, get_job_stats
-from typing import List, Dict
+from jobs_api import fetch_todays_jobs, get_job_stats, get_salary_range as read_salary_range, find_jobs, find_jobs_near
+from async_database import read_posting, search_postings_text
+from typing import List, Dict, Optional
 
 mcp = FastMCP("jobs_server")
 
@@ -17,7 +18,7 @@ async def search_jobs_today(category: str) -> List[Dict]:
         List of job postings from today
     """
     use_mock = True  # Set to False when you have RapidAPI key configured
-    return get_todays_jobs(category, use_mock=use_mock)
+    return await fetch_todays_jobs(category, use_mock=use_mock)
 
 
 @mcp.tool()
@@ -31,7 +32,7 @@ async def get_category_stats(category: str) -> Dict:
     Returns:
         Dictionary with total_jobs, avg_salary, and top locations
     """
-    return get_job_stats(category)
+    return await get_job_stats(category)
 
 
 @mcp.tool()
@@ -47,42 +48,98 @@ async def search_jobs_by_location(category: str, city: str, state: str) -> List[
     Returns:
         List of jobs in that location
     """
-    all_jobs = get_todays_jobs(category, use_mock=True)
-    location_search = f"{city}, {state}"
+    return await find_jobs(category, use_mock=True, location=f"{city}, {state}")
+
+
+@mcp.tool()
+async def search_jobs_near(lat: float, lon: float, radius_km: float = 50, category: Optional[str] = None,
+                           limit: int = 50) -> List[Dict]:
+    """
+    Search for today's jobs within a distance of a point, nearest first.
     
-    filtered_jobs = [
-        job for job in all_jobs 
-        if location_search.lower() in job.get("location", "").lower()
-    ]
+    Args:
+        lat: Latitude of the point (e.g., 40.7128 for New York)
+        lon: Longitude of the point (e.g., -74.0060 for New York)
+        radius_km: Search radius in kilometres
+        category: Optional job category; all categories fetched today if omitted
+        limit: Maximum number of jobs to return
     
-    return filtered_jobs
+    Returns:
+        List of job postings, each with its distance_km
+    """
+    return await find_jobs_near(lat, lon, radius_km, category=category, use_mock=True, limit=limit)
 
 
 @mcp.tool()
-async def get_salary_range(category: str) -> Dict:
+async def filter_jobs(category: str, company: Optional[str] = None, employment_type: Optional[str] = None,
+                      min_salary: Optional[int] = None, max_salary: Optional[int] = None, limit: int = 50) -> List[Dict]:
     """
-    Get salary range information for a job category.
+    Filter today's jobs in a category by company, employment type and salary.
     
     Args:
         category: Job category
+        company: Employer name (e.g., "Google")
+        employment_type: One of "FULLTIME", "PARTTIME", "CONTRACTOR", "INTERN"
+        min_salary: Lowest acceptable maximum salary
+        max_salary: Highest acceptable maximum salary
+        limit: Maximum number of jobs to return
     
     Returns:
-        Dictionary with min, max, and average salaries
+        List of matching job postings
+    """
+    return await find_jobs(category, use_mock=True, company=company, employment_type=employment_type,
+                           min_salary=min_salary, max_salary=max_salary, limit=limit)
+
+
+@mcp.tool()
+async def search_jobs_text(query: str, limit: int = 10, category: Optional[str] = None, location: Optional[str] = None,
+                           company: Optional[str] = None, employment_type: Optional[str] = None,
+                           min_salary: Optional[int] = None) -> List[Dict]:
+    """
+    Search job titles, companies and descriptions by keyword, best matches first.
+    
+    Args:
+        query: Keywords (e.g., "snowflake", "remote healthcare"); supports OR, NOT, "exact phrases" and prefix*
+        limit: Maximum number of jobs to return
+        category: Only jobs listed under this category
+        location: Only jobs in this "City, ST" location
+        company: Only jobs from this employer
+        employment_type: One of "FULLTIME", "PARTTIME", "CONTRACTOR", "INTERN"
+        min_salary: Lowest acceptable maximum salary
+    
+    Returns:
+        List of job postings with a relevance score and a snippet of the matching text
     """
-    stats = get_job_stats(category)
-    jobs = stats.get("jobs", [])
+    return await search_postings_text(query, limit, category=category, location=location,
+                                      company=company, employment_type=employment_type, min_salary=min_salary)
+
+
+@mcp.tool()
+async def get_job_posting(job_id: str) -> Dict:
+    """
+    Get one job posting by its job_id.
     
-    salaries = [j["salary_max"] for j in jobs if j.get("salary_max")]
+    Args:
+        job_id: The posting's job_id
     
-    if not salaries:
-        return {"min": 0, "max": 0, "avg": 0, "count": 0}
+    Returns:
+        The posting, with the dates it was first and last seen and its categories
+    """
+    return await read_posting(job_id) or {"error": f"No job posting {job_id}"}
+
+
+@mcp.tool()
+async def get_salary_range(category: str) -> Dict:
+    """
+    Get salary range information for a job category.
     
-    return {
-        "min": min(salaries),
-        "max": max(salaries),
-        "avg": sum(salaries) // len(salaries),
-        "count": len(salaries)
-    }
+    Args:
+        category: Job category
+    
+    Returns:
+        Dictionary with min, max, and average salaries
+    """
+    return await read_salary_range(category)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,88 @@
+"""
+A queued sink for log rows, so that logging doesn't add a database commit to every trade,
+report or tracer span.
+
+Rows are inserted in batches on a background thread. At most LOG_BUFFER_MAX_ROWS are held in
+memory; when the queue is full, LOG_BUFFER_POLICY decides whether callers wait ("block") or
+the row is counted and discarded ("drop"). Anything still queued is written at exit.
+"""
+import atexit
+import os
+import queue
+import threading
+import time
+
+LOG_BUFFER_MAX_ROWS = int(os.getenv("LOG_BUFFER_MAX_ROWS", "10000"))
+LOG_BUFFER_BATCH_SIZE = int(os.getenv("LOG_BUFFER_BATCH_SIZE", "500"))
+LOG_BUFFER_INTERVAL_SECONDS = float(os.getenv("LOG_BUFFER_INTERVAL_SECONDS", "0.5"))
+LOG_BUFFER_POLICY = os.getenv("LOG_BUFFER_POLICY", "block")
+
+class LogBuffer:
+    """
+    Queue rows and pass them to insert_many(rows) in batches of up to batch_size, at least
+    every interval seconds while rows are waiting.
+    """
+
+    def __init__(self, insert_many, max_rows: int = LOG_BUFFER_MAX_ROWS, batch_size: int = LOG_BUFFER_BATCH_SIZE,
+                 interval: float = LOG_BUFFER_INTERVAL_SECONDS, policy: str = LOG_BUFFER_POLICY):
+        if policy not in ("block", "drop"):
+            raise ValueError(f"Unknown log buffer policy {policy}")
+        self.insert_many = insert_many
+        self.batch_size = batch_size
+        self.interval = interval
+        self.policy = policy
+        self.dropped = 0
+        self.failed = 0
+        self._queue = queue.Queue(maxsize=max_rows)
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        atexit.register(self.flush)
+
+    def put(self, row: tuple) -> bool:
+        """ Queue a row, returning False if it was dropped because the buffer was full. """
+        self._start()
+        if self.policy == "block":
+            self._queue.put(row)
+            return True
+        try:
+            self._queue.put_nowait(row)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def flush(self):
+        """ Wait until every row queued so far has been written. """
+        if self._thread:
+            # The writer stops filling its batch at the marker and sets it once the rows before it are written
+            written = threading.Event()
+            self._queue.put(written)
+            written.wait()
+
+    def _start(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        while True:
+            items = [self._queue.get()]
+            # Give a burst up to interval seconds to arrive, so that it goes out as one insert
+            deadline = time.monotonic() + self.interval
+            try:
+                while not isinstance(items[-1], threading.Event) and len(items) < self.batch_size:
+                    items.append(self._queue.get(timeout=max(deadline - time.monotonic(), 0)))
+            except queue.Empty:
+                pass
+            rows = [item for item in items if not isinstance(item, threading.Event)]
+            try:
+                if rows:
+                    self.insert_many(rows)
+            except Exception as e:
+                self.failed += len(rows)
+                print(f"Could not write {len(rows)} log rows: {e}")
+            finally:
+                if isinstance(items[-1], threading.Event):
+                    items[-1].set()
@@ -1,5 +1,5 @@
 from mcp.server.fastmcp import FastMCP
-from database import write_log
+from async_database import write_log
 from datetime import datetime
 
 mcp = FastMCP("push_notification_server")
@@ -21,7 +21,7 @@ async def send_push_notification(tracker_name: str, message: str) -> str:
     notification = f"[{timestamp}] {tracker_name}: {message}"
     
     # Log to database
-    write_log(tracker_name, "notification", message)
+    await write_log(tracker_name, "notification", message)
     
     # In a real app, this would send to a notification service
     print(f"📱 PUSH: {notification}")
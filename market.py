@@ -1,30 +1,138 @@
 from polygon import RESTClient
 from dotenv import load_dotenv
 import os
+import sys
+import json
+from pathlib import Path
 from datetime import datetime
-import random
-from database import write_market, read_market
+import math
+import hashlib
+from database import read_market, write_prices, has_prices, read_price, read_prices, read_price_history
 from functools import lru_cache
-from datetime import timezone
+from datetime import timezone, timedelta
+from concurrent.futures import Future
+from zoneinfo import ZoneInfo
+import threading
+import time
 
 load_dotenv(override=True)
 
 polygon_api_key = os.getenv("POLYGON_API_KEY")
 polygon_plan = os.getenv("POLYGON_PLAN")
+polygon_base_url = os.getenv("POLYGON_BASE_URL", "https://api.polygon.io")
 
 is_paid_polygon = polygon_plan == "paid"
 is_realtime_polygon = polygon_plan == "realtime"
 
+# Maximum number of tickers requested in one snapshot call
+SNAPSHOT_BATCH_SIZE = 250
+
+# How long a live quote is reused before it is fetched again
+QUOTE_TTL_SECONDS = float(os.getenv("QUOTE_TTL_SECONDS", "1.0"))
+
+# Market status is re-checked at the next session boundary (pre-market, open, close, after-hours end)
+# or after this many seconds, whichever comes first, so early closes and halts are still picked up
+MARKET_STATUS_MAX_AGE_SECONDS = 300
+MARKET_TIMEZONE = ZoneInfo("America/New_York")
+MARKET_BOUNDARIES = [(4, 0), (9, 30), (16, 0), (20, 0)]
+
+# Offline price feeds: "polygon", "simulated" or "replay"; defaults to polygon when a key is configured
+PRICE_FEED = os.getenv("PRICE_FEED") or ("polygon" if polygon_api_key else "simulated")
+PRICE_SIM_SEED = int(os.getenv("PRICE_SIM_SEED", "42"))
+PRICE_SIM_STEP_SECONDS = float(os.getenv("PRICE_SIM_STEP_SECONDS", "60"))
+PRICE_SIM_EPOCH = datetime(2025, 1, 1, tzinfo=timezone.utc).timestamp()
+TRADING_SECONDS_PER_YEAR = 252 * 6.5 * 3600
+
+
+@lru_cache(maxsize=1)
+def get_client() -> RESTClient:
+    """One long-lived client per process; its urllib3 pool keeps connections to Polygon open."""
+    return RESTClient(polygon_api_key, base=polygon_base_url)
+
+
+class QuoteCache:
+    """
+    Thread-safe TTL cache of prices. Concurrent misses for the same symbol share one fetch:
+    the first caller fetches and the others wait on its result.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._quotes: dict[str, tuple[float, float]] = {}
+        self._inflight: dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def get_many(self, symbols: list[str], fetch) -> dict[str, float]:
+        """Return prices for symbols, calling fetch(missing_symbols) -> dict for any not cached."""
+        now = time.monotonic()
+        prices, owned, waiting = {}, {}, {}
+        with self._lock:
+            for symbol in symbols:
+                quote = self._quotes.get(symbol)
+                if quote and quote[0] > now:
+                    prices[symbol] = quote[1]
+                elif symbol in self._inflight:
+                    waiting[symbol] = self._inflight[symbol]
+                else:
+                    owned[symbol] = self._inflight[symbol] = Future()
+        if owned:
+            try:
+                fetched = fetch(list(owned))
+            except Exception as e:
+                with self._lock:
+                    for symbol, future in owned.items():
+                        del self._inflight[symbol]
+                        future.set_exception(e)
+                raise
+            expires = time.monotonic() + self.ttl
+            with self._lock:
+                for symbol, future in owned.items():
+                    price = fetched.get(symbol, 0.0)
+                    self._quotes[symbol] = (expires, price)
+                    del self._inflight[symbol]
+                    future.set_result(price)
+                    prices[symbol] = price
+        for symbol, future in waiting.items():
+            prices[symbol] = future.result()
+        return prices
+
+    def clear(self):
+        with self._lock:
+            self._quotes.clear()
+
+
+quote_cache = QuoteCache(QUOTE_TTL_SECONDS)
+
+_market_status_lock = threading.Lock()
+_market_status: tuple[float, bool] | None = None
+
+
+def next_market_boundary(now: datetime) -> datetime:
+    local = now.astimezone(MARKET_TIMEZONE)
+    for hour, minute in MARKET_BOUNDARIES:
+        boundary = local.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        if boundary > local:
+            return boundary
+    hour, minute = MARKET_BOUNDARIES[0]
+    return (local + timedelta(days=1)).replace(hour=hour, minute=minute, second=0, microsecond=0)
+
 
 def is_market_open() -> bool:
-    client = RESTClient(polygon_api_key)
-    market_status = client.get_market_status()
-    return market_status.market == "open"
+    global _market_status
+    with _market_status_lock:
+        if _market_status and _market_status[0] > time.time():
+            return _market_status[1]
+        market_status = get_client().get_market_status()
+        is_open = market_status.market == "open"
+        now = datetime.now(timezone.utc)
+        expires = min(next_market_boundary(now).timestamp(), now.timestamp() + MARKET_STATUS_MAX_AGE_SECONDS)
+        _market_status = (expires, is_open)
+        return is_open
 
 
 def get_all_share_prices_polygon_eod() -> dict[str, float]:
     """With much thanks to student Reema R. for fixing the timezone issue with this!"""
-    client = RESTClient(polygon_api_key)
+    client = get_client()
 
     probe = client.get_previous_close_agg("SPY")[0]
     last_close = datetime.fromtimestamp(probe.timestamp / 1000, tz=timezone.utc).date()
@@ -34,24 +142,41 @@ def get_all_share_prices_polygon_eod() -> dict[str, float]:
 
 
 @lru_cache(maxsize=2)
-def get_market_for_prior_date(today):
-    market_data = read_market(today)
-    if not market_data:
-        market_data = get_all_share_prices_polygon_eod()
-        write_market(today, market_data)
-    return market_data
+def load_market_for_prior_date(today) -> None:
+    """Make sure the prices table holds the prior close for today, fetching it at most once."""
+    if has_prices(today):
+        return
+    market_data = read_market(today) or get_all_share_prices_polygon_eod()
+    write_prices((today, symbol, close) for symbol, close in market_data.items())
 
 
 def get_share_price_polygon_eod(symbol) -> float:
     today = datetime.now().date().strftime("%Y-%m-%d")
-    market_data = get_market_for_prior_date(today)
-    return market_data.get(symbol, 0.0)
+    load_market_for_prior_date(today)
+    return read_price(today, symbol) or 0.0
 
 
 def get_share_price_polygon_min(symbol) -> float:
-    client = RESTClient(polygon_api_key)
-    result = client.get_snapshot_ticker("stocks", symbol)
-    return result.min.close or result.prev_day.close
+    return get_share_prices_polygon_min([symbol]).get(symbol, 0.0)
+
+
+def get_share_prices_polygon_eod(symbols: list[str]) -> dict[str, float]:
+    today = datetime.now().date().strftime("%Y-%m-%d")
+    load_market_for_prior_date(today)
+    return read_prices(today, symbols)
+
+
+def fetch_snapshots_polygon(symbols: list[str]) -> dict[str, float]:
+    client = get_client()
+    prices = {}
+    for i in range(0, len(symbols), SNAPSHOT_BATCH_SIZE):
+        for result in client.get_snapshot_all("stocks", tickers=symbols[i:i + SNAPSHOT_BATCH_SIZE]):
+            prices[result.ticker] = (result.min and result.min.close) or result.prev_day.close
+    return prices
+
+
+def get_share_prices_polygon_min(symbols: list[str]) -> dict[str, float]:
+    return quote_cache.get_many(symbols, fetch_snapshots_polygon)
 
 
 def get_share_price_polygon(symbol) -> float:
@@ -61,10 +186,176 @@ def get_share_price_polygon(symbol) -> float:
         return get_share_price_polygon_eod(symbol)
 
 
+def get_share_prices_polygon(symbols: list[str]) -> dict[str, float]:
+    if is_paid_polygon:
+        return get_share_prices_polygon_min(symbols)
+    else:
+        return get_share_prices_polygon_eod(symbols)
+
+
+class PriceFeed:
+    """A source of share prices. Subclasses implement get_prices; missing symbols are left out."""
+
+    name = "base"
+
+    def get_prices(self, symbols: list[str]) -> dict[str, float]:
+        raise NotImplementedError
+
+    def get_price(self, symbol: str) -> float:
+        return self.get_prices([symbol]).get(symbol, 0.0)
+
+
+class PolygonFeed(PriceFeed):
+    name = "polygon"
+
+    def get_prices(self, symbols: list[str]) -> dict[str, float]:
+        return get_share_prices_polygon(symbols)
+
+    def get_price(self, symbol: str) -> float:
+        return get_share_price_polygon(symbol)
+
+
+class SimulatedFeed(PriceFeed):
+    """
+    Seeded geometric Brownian motion. Each symbol gets its own start price, drift and volatility
+    derived from the seed, and the clock is cut into steps of step_seconds. The Brownian path is
+    built by midpoint refinement keyed on (seed, symbol, step), so any step is priced in
+    O(HORIZON_BITS) without state, and every process sees the same price at the same time.
+    """
+
+    name = "simulated"
+    HORIZON_BITS = 32
+
+    def __init__(self, seed: int = PRICE_SIM_SEED, step_seconds: float = PRICE_SIM_STEP_SECONDS, clock=time.time):
+        self.seed = seed
+        self.step_seconds = step_seconds
+        self.clock = clock
+        self._latest: dict[str, tuple[int, float]] = {}
+
+    def _uniforms(self, *key) -> tuple[float, float]:
+        digest = hashlib.blake2b(repr((self.seed, *key)).encode(), digest_size=16).digest()
+        return (int.from_bytes(digest[:8], "big") + 1) / (2**64 + 1), (int.from_bytes(digest[8:], "big") + 1) / (2**64 + 1)
+
+    def _normal(self, *key) -> float:
+        u1, u2 = self._uniforms(*key)
+        return math.sqrt(-2 * math.log(u1)) * math.cos(2 * math.pi * u2)
+
+    def _brownian(self, symbol: str, step: int) -> float:
+        lo, hi = 0, 1 << self.HORIZON_BITS
+        w_lo, w_hi = 0.0, math.sqrt(hi) * self._normal(symbol, hi)
+        while hi - lo > 1:
+            mid = (lo + hi) // 2
+            w_mid = (w_lo + w_hi) / 2 + math.sqrt((hi - lo) / 4) * self._normal(symbol, mid)
+            if step < mid:
+                hi, w_hi = mid, w_mid
+            else:
+                lo, w_lo = mid, w_mid
+        return w_lo
+
+    def current_step(self) -> int:
+        return max(0, int((self.clock() - PRICE_SIM_EPOCH) // self.step_seconds))
+
+    def price_at(self, symbol: str, step: int) -> float:
+        u_start, u_drift = self._uniforms(symbol, "start")
+        u_volatility, _ = self._uniforms(symbol, "volatility")
+        start = 10 + 490 * u_start
+        drift = -0.05 + 0.2 * u_drift
+        volatility = 0.15 + 0.45 * u_volatility
+        dt = self.step_seconds / TRADING_SECONDS_PER_YEAR
+        log_return = (drift - volatility**2 / 2) * step * dt + volatility * math.sqrt(dt) * self._brownian(symbol, step)
+        return round(start * math.exp(log_return), 2)
+
+    def get_prices(self, symbols: list[str]) -> dict[str, float]:
+        step = self.current_step()
+        prices = {}
+        for symbol in symbols:
+            latest = self._latest.get(symbol)
+            if not latest or latest[0] != step:
+                latest = self._latest[symbol] = (step, self.price_at(symbol, step))
+            prices[symbol] = latest[1]
+        return prices
+
+
+class ReplayFeed(PriceFeed):
+    """Steps through the closes stored in the prices table, one close per step, looping at the end."""
+
+    name = "replay"
+
+    def __init__(self, step_seconds: float = PRICE_SIM_STEP_SECONDS, clock=time.time):
+        self.step_seconds = step_seconds
+        self.clock = clock
+        self._history: dict[str, list[float]] = {}
+
+    def get_prices(self, symbols: list[str]) -> dict[str, float]:
+        step = max(0, int((self.clock() - PRICE_SIM_EPOCH) // self.step_seconds))
+        prices = {}
+        for symbol in symbols:
+            if symbol not in self._history:
+                self._history[symbol] = [close for _, close in read_price_history(symbol)]
+            history = self._history[symbol]
+            if history:
+                prices[symbol] = history[step % len(history)]
+        return prices
+
+
+PRICE_FEEDS = {"polygon": PolygonFeed, "simulated": SimulatedFeed, "replay": ReplayFeed}
+
+price_feed: PriceFeed = PRICE_FEEDS[PRICE_FEED]()
+fallback_feed: PriceFeed = SimulatedFeed()
+
+
+def set_price_feed(feed: PriceFeed) -> None:
+    """Plug in a different price backend for this process."""
+    global price_feed
+    price_feed = feed
+
+
 def get_share_price(symbol) -> float:
-    if polygon_api_key:
-        try:
-            return get_share_price_polygon(symbol)
-        except Exception as e:
-            print(f"Was not able to use the polygon API due to {e}; using a random number")
-    return float(random.randint(1, 100))
+    try:
+        return price_feed.get_price(symbol)
+    except Exception as e:
+        print(f"Was not able to use the {price_feed.name} price feed due to {e}; using simulated prices")
+    return fallback_feed.get_price(symbol)
+
+
+def get_share_prices(symbols) -> dict[str, float]:
+    """Price many symbols at once; the polygon feed uses one grouped request per SNAPSHOT_BATCH_SIZE tickers."""
+    symbols = list(dict.fromkeys(symbols))
+    if not symbols:
+        return {}
+    try:
+        prices = price_feed.get_prices(symbols)
+    except Exception as e:
+        print(f"Was not able to use the {price_feed.name} price feed due to {e}; using simulated prices")
+        prices = fallback_feed.get_prices(symbols)
+    return {symbol: prices.get(symbol, 0.0) for symbol in symbols}
+
+
+def read_market_file(path: Path) -> list[tuple[str, str, float]]:
+    """
+    Parse a stored grouped-daily file into (date, symbol, close) rows. Accepts either the raw
+    Polygon response ({"results": [{"T": ..., "c": ..., "t": ...}]}) or a {symbol: close}
+    mapping whose file name is the date, e.g. 2025-01-02.json.
+    """
+    data = json.loads(path.read_text())
+    if "results" in data:
+        return [
+            (datetime.fromtimestamp(bar["t"] / 1000, tz=timezone.utc).date().isoformat(), bar["T"], bar["c"])
+            for bar in data["results"]
+        ]
+    return [(path.stem, symbol, close) for symbol, close in data.items()]
+
+
+def ingest_market_files(paths) -> int:
+    """Backfill the prices table from grouped-daily fixture files; returns the number of rows written."""
+    total = 0
+    for path in paths:
+        rows = read_market_file(Path(path))
+        write_prices(rows)
+        total += len(rows)
+        print(f"Ingested {len(rows)} prices from {path}")
+    return total
+
+
+if __name__ == "__main__":
+    ingest_market_files(sys.argv[1:])